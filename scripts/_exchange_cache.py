@@ -0,0 +1,68 @@
+"""
+Shared ccxt exchange helper for the scripts
+
+Keeps one initialized exchange instance per exchange name within a process and
+caches its markets on disk, so back-to-back script runs fetch markets from the
+exchange at most once per day.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import ccxt
+
+# Markets rarely change, so reuse a local copy for up to a day
+MARKETS_CACHE_TTL = 86400  # 24 hours in seconds
+
+_exchanges: Dict[str, ccxt.Exchange] = {}
+
+
+def markets_cache_path(name: str) -> Path:
+    """Return the on-disk markets cache file for an exchange."""
+    return Path(f"~/.cache/{name}_markets.json").expanduser()
+
+
+def load_markets(exchange: ccxt.Exchange) -> Dict:
+    """
+    Load markets into an exchange instance, preferring a fresh on-disk cache.
+
+    On a cache miss, fetch_markets + set_markets is used instead of load_markets to
+    skip the extra fetch_currencies request.
+
+    Args:
+        exchange: ccxt exchange instance
+
+    Returns:
+        Loaded markets dict keyed by symbol
+    """
+    cache_path = markets_cache_path(exchange.id)
+
+    if cache_path.exists() and time.time() - cache_path.stat().st_mtime < MARKETS_CACHE_TTL:
+        exchange.set_markets(json.loads(cache_path.read_text()))
+    else:
+        exchange.set_markets(exchange.fetch_markets())
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(exchange.markets, default=str))
+
+    return exchange.markets
+
+
+def get_exchange(name: str, config: Optional[Dict] = None) -> ccxt.Exchange:
+    """
+    Get a shared ccxt exchange instance with its markets already loaded.
+
+    Args:
+        name: ccxt exchange id (alpaca, coinbase, etc.)
+        config: ccxt constructor options, used when the instance is first created
+
+    Returns:
+        Initialized ccxt exchange instance
+    """
+    if name not in _exchanges:
+        exchange = getattr(ccxt, name)({'enableRateLimit': True, **(config or {})})
+        load_markets(exchange)
+        _exchanges[name] = exchange
+
+    return _exchanges[name]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time build of the Monte Carlo kernels
+
+Compiles the bootstrap kernels into a `mc_kernel` extension module next to this
+file, for machines that run mc_bootstrap without numba installed. mc_core only
+falls back to the extension when numba is not importable; with numba, the
+parallel JIT kernels (cached on disk after the first run) are faster.
+
+The kernels mirror mc_core's JIT kernels (same splitmix64 streams, so results
+match for a given seed) but run single-threaded, as pycc does not support
+parallel loops.
+
+Usage:
+    python scripts/_mc_aot.py
+"""
+
+import numpy as np
+from numba.pycc import CC
+
+cc = CC('mc_kernel')
+cc.verbose = True
+
+
+@cc.export('mc_stats', 'void(f4[:], u8[:], i8, f4[:], f4[:], f4[:])')
+def mc_stats(returns, seeds, num_trades, out_final, out_dd, out_win):
+    """Final return, max drawdown and win rate per simulation, written into out_final/out_dd/out_win."""
+    n = returns.size
+    for i in range(seeds.size):
+        state = seeds[i]
+        equity = 0.0
+        peak = 0.0
+        min_drawdown = 0.0
+        wins = 0
+        for _ in range(num_trades):
+            state = state + np.uint64(0x9E3779B97F4A7C15)
+            z = state
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z = z ^ (z >> np.uint64(31))
+            idx = int((z >> np.uint64(11)) * (1.0 / 9007199254740992.0) * n)
+            equity += returns[idx]
+            if returns[idx] > 0:
+                wins += 1
+            if equity > peak:
+                peak = equity
+            drawdown = equity - peak
+            if drawdown < min_drawdown:
+                min_drawdown = drawdown
+        out_final[i] = equity
+        out_dd[i] = min_drawdown
+        out_win[i] = wins / num_trades
+
+
+@cc.export('mc_paths', 'void(f4[:], u8[:], i8, f4[:, :])')
+def mc_paths(returns, seeds, num_trades, out_curves):
+    """Equity curves for the given simulation seeds, written into out_curves."""
+    n = returns.size
+    for i in range(seeds.size):
+        state = seeds[i]
+        equity = 0.0
+        out_curves[i, 0] = 0.0
+        for t in range(num_trades):
+            state = state + np.uint64(0x9E3779B97F4A7C15)
+            z = state
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z = z ^ (z >> np.uint64(31))
+            idx = int((z >> np.uint64(11)) * (1.0 / 9007199254740992.0) * n)
+            equity += returns[idx]
+            out_curves[i, t + 1] = equity
+
+
+if __name__ == "__main__":
+    cc.compile()
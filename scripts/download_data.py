@@ -8,13 +8,24 @@ Supports multiple exchanges and flexible date ranges.
 Usage:
     python scripts/download_data.py --exchange coinbase --days 365
     python scripts/download_data.py --exchange coinbase --timeframe 1h --pairs BTC/USD ETH/USD
+    python scripts/download_data.py --exchange coinbase --pairs BTC/USD ETH/USD --parallel
 """
 
 import argparse
+import asyncio
 import logging
-import subprocess
 import sys
-from typing import List
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import ccxt.async_support as ccxt_async
+import pandas as pd
+from freqtrade.configuration import Configuration, TimeRange
+from freqtrade.data.history import refresh_backtest_ohlcv_data
+from freqtrade.resolvers import ExchangeResolver
+
+from _exchange_cache import get_exchange
 
 # Set up logging
 logging.basicConfig(
@@ -33,7 +44,7 @@ def download_data(
     config: str = "user_data/config.paper.json"
 ) -> bool:
     """
-    Download historical data using Freqtrade's download-data command.
+    Download historical data in-process using Freqtrade's data download API.
     
     Args:
         exchange: Exchange name (coinbase, binance, etc.)
@@ -47,39 +58,153 @@ def download_data(
         bool: True if successful, False otherwise
     """
     try:
-        # Build the command
-        cmd = [
-            "freqtrade", "download-data",
-            "--exchange", exchange,
-            "--timeframe", timeframe,
-            "--days", days,
-            "--config", config
-        ]
-        
-        # Add quote currency if no specific pairs provided
+        # Build the config from file, overriding the exchange
+        ft_config = Configuration.from_files([config])
+        ft_config['exchange']['name'] = exchange
+        ft_config['timeframes'] = [timeframe]
+        ft_config.setdefault('stake_currency', quote_currency)
+        
+        datadir = Path(ft_config.get('datadir', f"user_data/data/{exchange}"))
+        
+        time_since = (datetime.now() - timedelta(days=int(days))).strftime("%Y%m%d")
+        timerange = TimeRange.parse_timerange(f"{time_since}-")
+        
+        ft_exchange = ExchangeResolver.load_exchange(ft_config, validate=False)
+        
+        # Use all active pairs for the quote currency if no specific pairs provided
         if not pairs:
-            cmd.extend(["--quote-currency", quote_currency])
-        else:
-            # Add specific pairs
-            for pair in pairs:
-                cmd.extend(["--pairs", pair])
+            pairs = [
+                symbol for symbol, market in ft_exchange.markets.items()
+                if market.get('quote') == quote_currency and market.get('active', True)
+            ]
         
-        logger.info(f"Executing command: {' '.join(cmd)}")
+        logger.info(f"Downloading {timeframe} data for {len(pairs)} pairs "
+                    f"from {exchange} since {time_since} into {datadir}")
         
-        # Run the command
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        pairs_not_available = refresh_backtest_ohlcv_data(
+            ft_exchange,
+            pairs=pairs,
+            timeframes=[timeframe],
+            datadir=datadir,
+            trading_mode=ft_config.get('trading_mode', 'spot'),
+            timerange=timerange,
+        )
+        
+        if pairs_not_available:
+            logger.warning(f"Pairs not available on {exchange}: {', '.join(pairs_not_available)}")
         
         logger.info("Data download completed successfully!")
-        logger.info(result.stdout)
         
         return True
         
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         logger.error(f"Error downloading data: {e}")
-        logger.error(f"stderr: {e.stderr}")
         return False
+
+
+async def _fetch_pair_ohlcv(ex, pair: str, timeframe: str, since_ms: int) -> List[list]:
+    """Fetch all closed candles for a single pair from since_ms until now, paginating."""
+    timeframe_ms = ex.parse_timeframe(timeframe) * 1000
+    now_ms = ex.milliseconds()
+    candles = []
+    
+    while since_ms < now_ms:
+        batch = await ex.fetch_ohlcv(pair, timeframe, since=since_ms, limit=1000)
+        if not batch:
+            break
+        # Drop the still-forming candle, as freqtrade's own downloader does
+        candles.extend(candle for candle in batch if candle[0] + timeframe_ms <= now_ms)
+        since_ms = batch[-1][0] + timeframe_ms
+    
+    return candles
+
+
+async def _download_pairs_async(
+    exchange: str,
+    pairs: List[str],
+    timeframe: str,
+    since_ms: int,
+    markets: Dict
+) -> List[List[list]]:
+    """Fetch OHLCV for all pairs concurrently on a single rate-limited exchange instance."""
+    ex = getattr(ccxt_async, exchange)({'enableRateLimit': True})
+    try:
+        ex.set_markets(markets)
+        return await asyncio.gather(
+            *[_fetch_pair_ohlcv(ex, pair, timeframe, since_ms) for pair in pairs]
+        )
+    finally:
+        await ex.close()
+
+
+def download_data_parallel(
+    exchange: str = "coinbase",
+    timeframe: str = "1h",
+    days: str = "365",
+    pairs: List[str] = None,
+    config: str = "user_data/config.paper.json",
+    datadir: str = None
+) -> bool:
+    """
+    Download historical data for several pairs concurrently using ccxt's async API.
+    
+    Files are written in Freqtrade's feather layout so backtesting picks them up,
+    merged with any candles already stored for the pair.
+    
+    Args:
+        exchange: Exchange name (coinbase, binance, etc.)
+        timeframe: Timeframe (1m, 5m, 1h, 1d, etc.)
+        days: Number of days to download
+        pairs: Pairs to download
+        config: Config file path, for its datadir
+        datadir: Output directory (default: the config's datadir)
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        if not pairs:
+            raise ValueError("--parallel requires explicit --pairs")
+        
+        if datadir is None:
+            # Same data directory as the in-process download
+            ft_config = Configuration.from_files([config])
+            datadir = ft_config.get('datadir', f"user_data/data/{exchange}")
+        output_dir = Path(datadir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        since_ms = int((datetime.now() - timedelta(days=int(days))).timestamp() * 1000)
+        
+        logger.info(f"Downloading {timeframe} data for {len(pairs)} pairs in parallel from {exchange}")
+        # Reuse the shared (disk-cached) markets instead of fetching them again
+        markets = get_exchange(exchange).markets
+        results = asyncio.run(_download_pairs_async(exchange, pairs, timeframe, since_ms, markets))
+        
+        for pair, candles in zip(pairs, results):
+            if not candles:
+                logger.warning(f"No data returned for {pair}")
+                continue
+            
+            df = pd.DataFrame(candles, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+            df['date'] = pd.to_datetime(df['date'], unit='ms', utc=True)
+            
+            # Extend the stored history rather than replacing it; fresh candles win
+            file_path = output_dir / f"{pair.replace('/', '_')}-{timeframe}.feather"
+            if file_path.exists():
+                df = pd.concat([pd.read_feather(file_path), df], ignore_index=True)
+            df = (df.drop_duplicates(subset='date', keep='last')
+                    .sort_values('date')
+                    .reset_index(drop=True))
+            
+            df.to_feather(file_path)
+            logger.info(f"Saved {len(df)} candles for {pair} to {file_path}")
+        
+        logger.info("Parallel data download completed successfully!")
+        
+        return True
+        
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error(f"Error downloading data in parallel: {e}")
         return False
 
 
@@ -127,6 +252,12 @@ def main():
         help="Config file to use"
     )
     
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Fetch pairs concurrently via ccxt async (requires --pairs)"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -140,14 +271,23 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Download data
-    success = download_data(
-        exchange=args.exchange,
-        quote_currency=args.quote,
-        timeframe=args.timeframe,
-        days=args.days,
-        pairs=args.pairs,
-        config=args.config
-    )
+    if args.parallel:
+        success = download_data_parallel(
+            exchange=args.exchange,
+            timeframe=args.timeframe,
+            days=args.days,
+            pairs=args.pairs,
+            config=args.config
+        )
+    else:
+        success = download_data(
+            exchange=args.exchange,
+            quote_currency=args.quote,
+            timeframe=args.timeframe,
+            days=args.days,
+            pairs=args.pairs,
+            config=args.config
+        )
     
     if not success:
         sys.exit(1)
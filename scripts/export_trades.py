@@ -11,15 +11,25 @@ Usage:
 """
 
 import argparse
+import csv
 import logging
 import os
+import sqlite3
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
 
 # Set up logging
 logging.basicConfig(
@@ -28,6 +38,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+TRADES_QUERY = """
+SELECT
+    id,
+    exchange,
+    pair,
+    is_open,
+    fee_open,
+    fee_close,
+    CAST(open_rate AS REAL) AS open_rate,
+    CAST(close_rate AS REAL) AS close_rate,
+    amount,
+    stake_amount,
+    CAST(close_profit AS REAL) AS close_profit,
+    CAST(close_profit_abs AS REAL) AS close_profit_abs,
+    sell_reason as exit_reason,
+    strategy,
+    enter_tag,
+    timeframe,
+    open_date,
+    close_date,
+    stop_loss,
+    CAST(initial_stop_loss AS REAL) AS initial_stop_loss
+FROM trades
+ORDER BY open_date DESC
+"""
+
+# Low-cardinality string columns stored as categoricals
+CATEGORICAL_COLUMNS = ('exchange', 'pair', 'strategy', 'enter_tag', 'exit_reason')
+
+# Columns written by the streaming export, in output order
+STREAM_EXTRA_COLUMNS = ['duration_hours', 'r_multiple', 'r_multiple_stop']
+
+SUMMARY_STATS_QUERY = """
+SELECT
+    COUNT(*) AS total_trades,
+    SUM(CASE WHEN close_profit > 0 THEN 1 ELSE 0 END) AS winning_trades,
+    SUM(CASE WHEN close_profit <= 0 THEN 1 ELSE 0 END) AS losing_trades,
+    SUM(close_profit_abs) AS total_profit_abs,
+    SUM(close_profit) * 100 AS total_profit_pct,
+    AVG(close_profit_abs) AS avg_profit_abs,
+    AVG(close_profit) * 100 AS avg_profit_pct,
+    MAX(close_profit_abs) AS best_trade_abs,
+    MIN(close_profit_abs) AS worst_trade_abs,
+    MAX(close_profit) * 100 AS best_trade_pct,
+    MIN(close_profit) * 100 AS worst_trade_pct
+FROM trades
+WHERE is_open = 0
+"""
+
 
 def load_freqtrade_config(config_path: str) -> Dict:
     """Load Freqtrade configuration from JSON file."""
@@ -42,83 +101,66 @@ def load_freqtrade_config(config_path: str) -> Dict:
         raise
 
 
-def connect_to_database(db_url: str):
-    """Connect to the Freqtrade database."""
+def connect_to_database(db_url: str) -> sqlite3.Connection:
+    """Open a read-only sqlite3 connection to the Freqtrade database."""
     try:
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
+        if not db_url.startswith('sqlite:///'):
+            raise ValueError(f"Only sqlite:/// database URLs are supported, got {db_url}")
         
-        engine = create_engine(db_url)
-        Session = sessionmaker(bind=engine)
-        session = Session()
+        db_path = Path(db_url[len('sqlite:///'):]).resolve()
         
-        return session, engine
+        # Read-only URI; not immutable, since a running bot may still have data in the WAL
+        return sqlite3.connect(f"file:{db_path.as_posix()}?mode=ro", uri=True, isolation_level=None)
     except Exception as e:
         logger.error(f"Error connecting to database {db_url}: {e}")
         raise
 
 
-def export_trades_from_db(config_path: str) -> pd.DataFrame:
+def open_database(config_path: str) -> sqlite3.Connection:
+    """Open the database configured in a Freqtrade config file (see connect_to_database)."""
+    config = load_freqtrade_config(config_path)
+    db_url = config.get('db_url', 'sqlite:///user_data/trades.sqlite')
+    
+    logger.info(f"Connecting to database: {db_url}")
+    return connect_to_database(db_url)
+
+
+def export_trades_from_db(config_path: str, conn: Optional[sqlite3.Connection] = None) -> pd.DataFrame:
     """
     Export trades directly from Freqtrade database.
     
     Args:
         config_path: Path to Freqtrade config file
+        conn: Open database connection to reuse (default: open and close one)
         
     Returns:
         DataFrame with trade data
     """
     try:
-        # Load config
-        config = load_freqtrade_config(config_path)
-        db_url = config.get('db_url', 'sqlite:///user_data/trades.sqlite')
-        
-        logger.info(f"Connecting to database: {db_url}")
-        
-        # Connect to database
-        session, engine = connect_to_database(db_url)
-        
-        # Query trades table
-        query = """
-        SELECT 
-            id,
-            exchange,
-            pair,
-            is_open,
-            fee_open,
-            fee_close,
-            open_rate,
-            close_rate,
-            amount,
-            amount_requested,
-            stake_amount,
-            close_profit,
-            close_profit_abs,
-            sell_reason as exit_reason,
-            strategy,
-            enter_tag,
-            timeframe,
-            open_date,
-            close_date,
-            open_order_id,
-            stop_loss,
-            initial_stop_loss,
-            stoploss_order_id,
-            stoploss_last_update,
-            max_rate,
-            min_rate,
-            exit_order_id,
-            realized_profit
-        FROM trades
-        ORDER BY open_date DESC
-        """
-        
-        df = pd.read_sql_query(query, engine)
+        owns_conn = conn is None
+        if owns_conn:
+            conn = open_database(config_path)
+        
+        try:
+            # Read in chunks into Arrow-backed columns to keep peak memory down
+            df = pd.concat(
+                pd.read_sql_query(
+                    TRADES_QUERY,
+                    conn,
+                    chunksize=10_000,
+                    dtype_backend="pyarrow",
+                    parse_dates=["open_date", "close_date"]
+                ),
+                ignore_index=True
+            )
+        finally:
+            if owns_conn:
+                conn.close()
+        
         logger.info(f"Exported {len(df)} trades from database")
         
-        # Close connections
-        session.close()
-        engine.dispose()
+        for column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
         
         return df
         
@@ -127,6 +169,149 @@ def export_trades_from_db(config_path: str) -> pd.DataFrame:
         raise
 
 
+def export_summary_stats_from_db(config_path: str, conn: Optional[sqlite3.Connection] = None) -> Dict:
+    """
+    Compute closed-trade summary statistics in SQLite with a single aggregate query.
+    
+    Args:
+        config_path: Path to Freqtrade config file
+        conn: Open database connection to reuse (default: open and close one)
+        
+    Returns:
+        Dictionary of summary statistics keyed like calculate_performance_metrics
+    """
+    try:
+        owns_conn = conn is None
+        if owns_conn:
+            conn = open_database(config_path)
+        
+        try:
+            cursor = conn.execute(SUMMARY_STATS_QUERY)
+            row = cursor.fetchone()
+            columns = [d[0] for d in cursor.description]
+        finally:
+            if owns_conn:
+                conn.close()
+        
+        return dict(zip(columns, row))
+        
+    except Exception as e:
+        logger.error(f"Error computing summary stats: {e}")
+        raise
+
+
+def stream_trades_to_csv(
+    config_path: str,
+    output_file: str,
+    r_usd: float = 5.0,
+    chunksize: int = 50_000,
+    conn: Optional[sqlite3.Connection] = None
+) -> int:
+    """
+    Stream trades from the database to CSV chunk by chunk to cap peak memory.
+    
+    R-multiples and durations are row-local, so each chunk is processed independently.
+    
+    Args:
+        config_path: Path to Freqtrade config file
+        output_file: Destination CSV path
+        r_usd: Risk amount in USD per trade
+        chunksize: Number of trades held in memory at once
+        conn: Open database connection to reuse (default: open and close one)
+        
+    Returns:
+        Number of trades written
+    """
+    try:
+        owns_conn = conn is None
+        if owns_conn:
+            conn = open_database(config_path)
+        num_trades = 0
+        
+        try:
+            with open(output_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                columns = None
+                
+                for chunk in pd.read_sql_query(
+                    TRADES_QUERY,
+                    conn,
+                    chunksize=chunksize,
+                    parse_dates=["open_date", "close_date"]
+                ):
+                    chunk = calculate_r_multiples(chunk, r_usd)
+                    
+                    if columns is None:
+                        columns = list(chunk.columns.drop(STREAM_EXTRA_COLUMNS, errors='ignore'))
+                        columns += STREAM_EXTRA_COLUMNS
+                        writer.writerow(columns)
+                    
+                    chunk = chunk.reindex(columns=columns)
+                    # Empty fields for missing values, as write_trades' PyArrow writer
+                    # emits, rather than csv's literal nan/NaT
+                    chunk = chunk.astype(object).where(chunk.notna(), '')
+                    writer.writerows(chunk.itertuples(index=False, name=None))
+                    num_trades += len(chunk)
+        finally:
+            if owns_conn:
+                conn.close()
+        
+        logger.info(f"Streamed {num_trades} trades to {output_file}")
+        return num_trades
+        
+    except Exception as e:
+        logger.error(f"Error streaming trades: {e}")
+        raise
+
+
+def _drawdown_numpy(profits: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """NumPy fallback: cumsum, running max and drawdown as three array passes."""
+    cumulative = np.cumsum(profits)
+    running_max = np.maximum.accumulate(cumulative)
+    drawdown = cumulative - running_max
+    return cumulative, running_max, drawdown
+
+
+def _drawdown_kernel(profits: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Fused single-pass cumsum, running max and drawdown."""
+    n = profits.size
+    cumulative = np.empty(n)
+    running_max = np.empty(n)
+    drawdown = np.empty(n)
+    total = 0.0
+    peak = -np.inf
+    for i in range(n):
+        total += profits[i]
+        cumulative[i] = total
+        if total > peak:
+            peak = total
+        running_max[i] = peak
+        drawdown[i] = total - peak
+    return cumulative, running_max, drawdown
+
+
+if njit is not None:
+    _drawdown_kernel = njit(cache=True)(_drawdown_kernel)
+
+
+def calculate_drawdown(profits: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate cumulative profit, running peak and drawdown for an ordered profit series.
+    
+    Uses a fused Numba kernel when numba is installed, otherwise NumPy.
+    
+    Args:
+        profits: Per-trade profits in chronological order
+        
+    Returns:
+        Tuple of (cumulative, running_max, drawdown) arrays
+    """
+    profits = np.ascontiguousarray(profits, dtype=np.float64)
+    if njit is None:
+        return _drawdown_numpy(profits)
+    return _drawdown_kernel(profits)
+
+
 def calculate_r_multiples(df: pd.DataFrame, r_usd: float = 5.0) -> pd.DataFrame:
     """
     Calculate R-multiples for each trade.
@@ -143,38 +328,38 @@ def calculate_r_multiples(df: pd.DataFrame, r_usd: float = 5.0) -> pd.DataFrame:
     try:
         df = df.copy()
         
-        # Calculate trade duration
-        df['open_date'] = pd.to_datetime(df['open_date'])
-        df['close_date'] = pd.to_datetime(df['close_date'])
-        df['duration_hours'] = (df['close_date'] - df['open_date']).dt.total_seconds() / 3600
+        # Calculate trade duration (dates are parsed on load) via int64 nanosecond subtraction
+        open_dt = df['open_date'].astype('datetime64[ns]').to_numpy()
+        close_dt = df['close_date'].astype('datetime64[ns]').to_numpy()
+        duration_ns = close_dt.view('int64') - open_dt.view('int64')
+        df['duration_hours'] = np.where(
+            np.isnat(open_dt) | np.isnat(close_dt), np.nan, duration_ns * (1.0 / 3.6e12)
+        )
         
-        # Calculate R-multiples for closed trades
-        closed_trades = df[df['is_open'] == 0].copy()
+        # Calculate R-multiples for closed trades in place (open trades stay NaN)
+        closed_mask = df['is_open'].eq(0).to_numpy(dtype=bool, na_value=False)
         
-        if len(closed_trades) > 0:
+        if closed_mask.any():
             # Simple R calculation based on profit/loss vs risk amount
-            closed_trades['r_multiple'] = closed_trades['close_profit_abs'] / r_usd
-            
-            # Alternative R calculation using stop loss (if available)
-            mask = (closed_trades['initial_stop_loss'].notna()) & (closed_trades['initial_stop_loss'] > 0)
-            if mask.any():
-                entry_stop_diff = closed_trades.loc[mask, 'open_rate'] - closed_trades.loc[mask, 'initial_stop_loss']
-                profit_loss = closed_trades.loc[mask, 'close_rate'] - closed_trades.loc[mask, 'open_rate']
-                closed_trades.loc[mask, 'r_multiple_stop'] = profit_loss / entry_stop_diff
-            
-            # Merge back
-            df = df.merge(
-                closed_trades[['id', 'r_multiple', 'duration_hours']].fillna(0),
-                on='id',
-                how='left'
+            profit_abs = df['close_profit_abs'].to_numpy(dtype=np.float64, na_value=np.nan)
+            r_multiple = profit_abs / r_usd
+            df['r_multiple'] = np.where(
+                closed_mask, np.where(np.isnan(r_multiple), 0.0, r_multiple), np.nan
             )
-            
-            if 'r_multiple_stop' in closed_trades.columns:
-                df = df.merge(
-                    closed_trades[['id', 'r_multiple_stop']].fillna(0),
-                    on='id',
-                    how='left'
-                )
+        
+        # Alternative R calculation using stop loss (if available). Always added, 0.0
+        # for closed trades without a stop, so a streamed chunk with no stop-loss
+        # trade gets the same values as the whole table
+        r_multiple_stop = np.where(closed_mask, 0.0, np.nan)
+        initial_stop = df['initial_stop_loss'].to_numpy(dtype=np.float64, na_value=np.nan)
+        stop_mask = closed_mask & (initial_stop > 0)
+        if stop_mask.any():
+            open_rate = df['open_rate'].to_numpy(dtype=np.float64, na_value=np.nan)
+            close_rate = df['close_rate'].to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                stop_r = (close_rate - open_rate) / (open_rate - initial_stop)
+            r_multiple_stop = np.where(stop_mask, stop_r, r_multiple_stop)
+        df['r_multiple_stop'] = r_multiple_stop
         
         return df
         
@@ -183,57 +368,83 @@ def calculate_r_multiples(df: pd.DataFrame, r_usd: float = 5.0) -> pd.DataFrame:
         return df
 
 
-def calculate_performance_metrics(df: pd.DataFrame) -> Dict:
-    """Calculate performance metrics from trades."""
+def calculate_performance_metrics(df: pd.DataFrame, summary: Optional[Dict] = None) -> Dict:
+    """
+    Calculate performance metrics from trades.
+    
+    Args:
+        df: DataFrame with trade data
+        summary: Pre-computed summary statistics from export_summary_stats_from_db (optional)
+        
+    Returns:
+        Dictionary of performance metrics
+    """
     try:
-        closed_trades = df[df['is_open'] == 0]
+        # Pull the needed columns out once as closed-trade NumPy arrays
+        closed_mask = df['is_open'].eq(0).to_numpy(dtype=bool, na_value=False)
+        num_closed = int(closed_mask.sum())
         
-        if len(closed_trades) == 0:
+        if num_closed == 0:
             return {"error": "No closed trades found"}
         
-        metrics = {}
-        
-        # Basic metrics
-        metrics['total_trades'] = len(closed_trades)
-        metrics['winning_trades'] = len(closed_trades[closed_trades['close_profit'] > 0])
-        metrics['losing_trades'] = len(closed_trades[closed_trades['close_profit'] <= 0])
-        metrics['win_rate'] = (metrics['winning_trades'] / metrics['total_trades']) * 100
-        
-        # Profit metrics
-        metrics['total_profit_abs'] = closed_trades['close_profit_abs'].sum()
-        metrics['total_profit_pct'] = closed_trades['close_profit'].sum() * 100
+        def closed_values(column: str) -> np.ndarray:
+            return df[column].to_numpy(dtype=np.float64, na_value=np.nan)[closed_mask]
         
-        metrics['avg_profit_abs'] = closed_trades['close_profit_abs'].mean()
-        metrics['avg_profit_pct'] = closed_trades['close_profit'].mean() * 100
+        profit_abs = closed_values('close_profit_abs')
         
-        metrics['best_trade_abs'] = closed_trades['close_profit_abs'].max()
-        metrics['worst_trade_abs'] = closed_trades['close_profit_abs'].min()
+        metrics = {}
         
-        metrics['best_trade_pct'] = closed_trades['close_profit'].max() * 100
-        metrics['worst_trade_pct'] = closed_trades['close_profit'].min() * 100
+        if summary and summary.get('total_trades'):
+            # Scalar aggregates were already computed by SQLite
+            metrics.update(summary)
+            metrics['win_rate'] = (metrics['winning_trades'] / metrics['total_trades']) * 100
+        else:
+            # Basic metrics
+            metrics['total_trades'] = num_closed
+            # Count losing/breakeven/winning trades in one pass: sign {-1, 0, 1} -> bins {0, 1, 2}
+            close_profit = closed_values('close_profit')
+            valid_profit = close_profit[~np.isnan(close_profit)]
+            sign_counts = np.bincount((np.sign(valid_profit) + 1).astype(np.intp), minlength=3)
+            metrics['winning_trades'] = int(sign_counts[2])
+            metrics['losing_trades'] = int(sign_counts[0] + sign_counts[1])
+            metrics['win_rate'] = (metrics['winning_trades'] / metrics['total_trades']) * 100
+            
+            # Profit metrics
+            metrics['total_profit_abs'] = float(np.nansum(profit_abs))
+            metrics['total_profit_pct'] = float(np.nansum(close_profit)) * 100
+            
+            metrics['avg_profit_abs'] = float(np.nanmean(profit_abs))
+            metrics['avg_profit_pct'] = float(np.nanmean(close_profit)) * 100
+            
+            metrics['best_trade_abs'] = float(np.nanmax(profit_abs))
+            metrics['worst_trade_abs'] = float(np.nanmin(profit_abs))
+            
+            metrics['best_trade_pct'] = float(np.nanmax(close_profit)) * 100
+            metrics['worst_trade_pct'] = float(np.nanmin(close_profit)) * 100
         
         # R-multiple metrics (if available)
-        if 'r_multiple' in closed_trades.columns:
-            r_data = closed_trades['r_multiple'].dropna()
-            if len(r_data) > 0:
-                metrics['avg_r_multiple'] = r_data.mean()
-                metrics['total_r_multiple'] = r_data.sum()
-                metrics['best_r_multiple'] = r_data.max()
-                metrics['worst_r_multiple'] = r_data.min()
+        if 'r_multiple' in df.columns:
+            r_data = closed_values('r_multiple')
+            r_data = r_data[~np.isnan(r_data)]
+            if r_data.size > 0:
+                metrics['avg_r_multiple'] = float(r_data.mean())
+                metrics['total_r_multiple'] = float(r_data.sum())
+                metrics['best_r_multiple'] = float(r_data.max())
+                metrics['worst_r_multiple'] = float(r_data.min())
         
         # Duration metrics
-        if 'duration_hours' in closed_trades.columns:
-            duration_data = closed_trades['duration_hours'].dropna()
-            if len(duration_data) > 0:
-                metrics['avg_duration_hours'] = duration_data.mean()
-                metrics['median_duration_hours'] = duration_data.median()
-        
-        # Drawdown calculation (simple)
-        closed_trades_sorted = closed_trades.sort_values('close_date')
-        cumulative_profit = closed_trades_sorted['close_profit_abs'].cumsum()
-        running_max = cumulative_profit.expanding().max()
-        drawdown = (cumulative_profit - running_max)
-        metrics['max_drawdown_abs'] = drawdown.min()
+        if 'duration_hours' in df.columns:
+            duration_data = closed_values('duration_hours')
+            duration_data = duration_data[~np.isnan(duration_data)]
+            if duration_data.size > 0:
+                metrics['avg_duration_hours'] = float(duration_data.mean())
+                metrics['median_duration_hours'] = float(np.median(duration_data))
+        
+        # Drawdown calculation (simple), in close order
+        close_dates = df['close_date'].astype('datetime64[ns]').to_numpy()[closed_mask]
+        order = np.argsort(close_dates, kind='stable')
+        _, _, drawdown = calculate_drawdown(np.nan_to_num(profit_abs[order], nan=0.0))
+        metrics['max_drawdown_abs'] = float(drawdown.min())
         
         return metrics
         
@@ -242,6 +453,26 @@ def calculate_performance_metrics(df: pd.DataFrame) -> Dict:
         return {"error": str(e)}
 
 
+def write_trades(df: pd.DataFrame, output_file: str) -> None:
+    """
+    Write trades to CSV (or Parquet for a .parquet path) using PyArrow's C++ writers.
+    
+    Args:
+        df: DataFrame with trade data
+        output_file: Destination file path
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    
+    if Path(output_file).suffix == '.parquet':
+        pq.write_table(table, output_file)
+    else:
+        # Decode categorical (dictionary) columns back to plain strings for CSV
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+        pacsv.write_csv(table, output_file, write_options=pacsv.WriteOptions(include_header=True))
+
+
 def main():
     """Main function to handle command line arguments and execute export."""
     parser = argparse.ArgumentParser(
@@ -258,7 +489,7 @@ def main():
     parser.add_argument(
         "--output",
         default="reports/trades_export.csv",
-        help="Output CSV file path"
+        help="Output CSV file path (use a .parquet suffix for Parquet output)"
     )
     
     parser.add_argument(
@@ -274,6 +505,12 @@ def main():
         help="Only show performance metrics, don't export CSV"
     )
     
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream trades to CSV in chunks to cap memory (metrics from SQL only)"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true", 
@@ -286,22 +523,47 @@ def main():
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
+    conn = None
     try:
-        # Export trades
-        logger.info(f"Exporting trades from config: {args.config}")
-        df = export_trades_from_db(args.config)
+        # One connection serves the trade export and the summary query
+        conn = open_database(args.config)
         
-        if len(df) == 0:
-            logger.warning("No trades found in database")
-            return
-        
-        # Calculate R-multiples
-        logger.info("Calculating R-multiples...")
-        df = calculate_r_multiples(df, args.r_usd)
-        
-        # Calculate performance metrics
-        logger.info("Calculating performance metrics...")
-        metrics = calculate_performance_metrics(df)
+        if args.stream and not args.metrics_only:
+            # Create output directory
+            output_path = Path(args.output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Stream trades straight to CSV; metrics come from SQL aggregates only
+            logger.info(f"Streaming trades from config: {args.config}")
+            num_trades = stream_trades_to_csv(args.config, args.output, args.r_usd, conn=conn)
+            
+            if num_trades == 0:
+                logger.warning("No trades found in database")
+                return
+            
+            logger.info("Calculating performance metrics...")
+            metrics = export_summary_stats_from_db(args.config, conn)
+            if metrics.get('total_trades'):
+                metrics['win_rate'] = (metrics['winning_trades'] / metrics['total_trades']) * 100
+            else:
+                metrics = {"error": "No closed trades found"}
+        else:
+            # Export trades
+            logger.info(f"Exporting trades from config: {args.config}")
+            df = export_trades_from_db(args.config, conn)
+            
+            if len(df) == 0:
+                logger.warning("No trades found in database")
+                return
+            
+            # Calculate R-multiples
+            logger.info("Calculating R-multiples...")
+            df = calculate_r_multiples(df, args.r_usd)
+            
+            # Calculate performance metrics
+            logger.info("Calculating performance metrics...")
+            summary = export_summary_stats_from_db(args.config, conn)
+            metrics = calculate_performance_metrics(df, summary)
         
         # Print metrics
         logger.info("\n" + "="*50)
@@ -324,15 +586,15 @@ def main():
             output_path = Path(args.output)
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Export to CSV
-            df.to_csv(args.output, index=False)
+            # Export to CSV (already written when streaming)
+            if not args.stream:
+                write_trades(df, args.output)
             logger.info(f"Trades exported to: {args.output}")
             
             # Also export metrics to JSON
-            metrics_path = output_path.parent / f"{output_path.stem}_metrics.json"
+            metrics_path = output_path.with_name(f"{output_path.stem}_metrics.json")
             import json
-            with open(metrics_path, 'w') as f:
-                json.dump(metrics, f, indent=2, default=str)
+            metrics_path.write_text(json.dumps(metrics, indent=2, default=str))
             logger.info(f"Metrics exported to: {metrics_path}")
         
         logger.info("Trade export completed successfully!")
@@ -340,6 +602,9 @@ def main():
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
         sys.exit(1)
+    finally:
+        if conn is not None:
+            conn.close()
 
 
 if __name__ == "__main__":
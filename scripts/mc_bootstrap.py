@@ -12,15 +12,14 @@ Usage:
 
 import argparse
 import logging
+import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import seaborn as sns
-from scipy import stats
+import orjson
+
+from mc_core import load_returns, run_bootstrap
 
 # Set up logging
 logging.basicConfig(
@@ -29,157 +28,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-
-def load_trade_data(file_path: str) -> pd.DataFrame:
-    """Load trade data from CSV file."""
-    try:
-        df = pd.read_csv(file_path)
-        logger.info(f"Loaded {len(df)} trades from {file_path}")
-        return df
-    except Exception as e:
-        logger.error(f"Error loading trade data: {e}")
-        raise
-
-
-def prepare_returns_data(df: pd.DataFrame) -> np.ndarray:
-    """
-    Prepare returns data for Monte Carlo simulation.
-    
-    Args:
-        df: DataFrame with trade data
-        
-    Returns:
-        Array of trade returns (R-multiples or profit percentages)
-    """
-    try:
-        # Filter to closed trades only
-        closed_trades = df[df['is_open'] == 0].copy()
-        
-        if len(closed_trades) == 0:
-            raise ValueError("No closed trades found")
-        
-        # Use R-multiples if available, otherwise profit percentages
-        if 'r_multiple' in closed_trades.columns:
-            returns = closed_trades['r_multiple'].dropna().values
-            logger.info(f"Using R-multiples for {len(returns)} trades")
-        else:
-            returns = closed_trades['close_profit'].dropna().values
-            logger.info(f"Using profit percentages for {len(returns)} trades")
-        
-        if len(returns) == 0:
-            raise ValueError("No valid returns data found")
-        
-        logger.info(f"Returns statistics:")
-        logger.info(f"  Mean: {np.mean(returns):.3f}")
-        logger.info(f"  Std: {np.std(returns):.3f}")
-        logger.info(f"  Min: {np.min(returns):.3f}")  
-        logger.info(f"  Max: {np.max(returns):.3f}")
-        
-        return returns
-        
-    except Exception as e:
-        logger.error(f"Error preparing returns data: {e}")
-        raise
-
-
-def run_monte_carlo_simulation(
-    returns: np.ndarray,
-    num_simulations: int = 5000,
-    num_trades_per_sim: int = None
-) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """
-    Run Monte Carlo bootstrap simulation.
-    
-    Args:
-        returns: Array of historical trade returns
-        num_simulations: Number of simulation runs
-        num_trades_per_sim: Number of trades per simulation (default: len(returns))
-        
-    Returns:
-        Tuple of (final_returns, max_drawdowns, equity_curves)
-    """
-    try:
-        if num_trades_per_sim is None:
-            num_trades_per_sim = len(returns)
-        
-        logger.info(f"Running {num_simulations} simulations with {num_trades_per_sim} trades each")
-        
-        final_returns = np.zeros(num_simulations)
-        max_drawdowns = np.zeros(num_simulations)
-        equity_curves = np.zeros((num_simulations, num_trades_per_sim + 1))
-        
-        for i in range(num_simulations):
-            # Bootstrap sample from historical returns
-            sim_returns = np.random.choice(returns, size=num_trades_per_sim, replace=True)
-            
-            # Calculate cumulative equity curve
-            equity_curve = np.concatenate([[0], np.cumsum(sim_returns)])
-            equity_curves[i] = equity_curve
-            
-            # Final return
-            final_returns[i] = equity_curve[-1]
-            
-            # Calculate maximum drawdown
-            running_max = np.maximum.accumulate(equity_curve)
-            drawdown = equity_curve - running_max
-            max_drawdowns[i] = np.min(drawdown)
-            
-            if (i + 1) % 1000 == 0:
-                logger.info(f"Completed {i + 1} simulations")
-        
-        logger.info("Monte Carlo simulation completed")
-        return final_returns, max_drawdowns, equity_curves
-        
-    except Exception as e:
-        logger.error(f"Error in Monte Carlo simulation: {e}")
-        raise
-
-
-def analyze_simulation_results(
-    final_returns: np.ndarray,
-    max_drawdowns: np.ndarray,
-    returns: np.ndarray
-) -> Dict:
-    """Analyze Monte Carlo simulation results."""
-    try:
-        results = {}
-        
-        # Final return statistics
-        results['final_return_mean'] = np.mean(final_returns)
-        results['final_return_median'] = np.median(final_returns)
-        results['final_return_std'] = np.std(final_returns)
-        results['final_return_5th_percentile'] = np.percentile(final_returns, 5)
-        results['final_return_95th_percentile'] = np.percentile(final_returns, 95)
-        
-        # Probability of positive returns
-        results['prob_positive_return'] = np.mean(final_returns > 0) * 100
-        
-        # Drawdown statistics
-        results['max_drawdown_mean'] = np.mean(max_drawdowns)
-        results['max_drawdown_median'] = np.median(max_drawdowns)
-        results['max_drawdown_std'] = np.std(max_drawdowns)
-        results['max_drawdown_5th_percentile'] = np.percentile(max_drawdowns, 5)
-        results['max_drawdown_95th_percentile'] = np.percentile(max_drawdowns, 95)
-        
-        # Risk metrics (assuming R-multiples)
-        if np.mean(returns) > 0:  # Check if using R-multiples
-            results['prob_drawdown_gt_3R'] = np.mean(max_drawdowns < -3) * 100
-            results['prob_drawdown_gt_5R'] = np.mean(max_drawdowns < -5) * 100
-            results['prob_drawdown_gt_10R'] = np.mean(max_drawdowns < -10) * 100
-        
-        # Value at Risk (VaR)
-        results['var_5_percent'] = np.percentile(final_returns, 5)
-        results['var_1_percent'] = np.percentile(final_returns, 1)
-        
-        # Expected shortfall (Conditional VaR)
-        var_5 = results['var_5_percent']
-        results['expected_shortfall_5_percent'] = np.mean(final_returns[final_returns <= var_5])
-        
-        return results
-        
-    except Exception as e:
-        logger.error(f"Error analyzing results: {e}")
-        return {}
+# Point plots (scatter, Q-Q) beyond this many simulations use a random subsample
+MAX_PLOT_POINTS = 5000
 
 
 def create_visualizations(
@@ -188,14 +38,25 @@ def create_visualizations(
     equity_curves: np.ndarray,
     output_dir: str = "reports"
 ):
-    """Create visualization plots."""
+    """Create visualization plots (equity_curves is the random subset kept by the simulation)."""
+    # Imported here so runs with --no-plots or --final-only don't pay for them
+    import matplotlib.pyplot as plt
+    from scipy import stats
+    
     try:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        rng = np.random.default_rng()
+        point_idx = slice(None)
+        if len(final_returns) > MAX_PLOT_POINTS:
+            point_idx = rng.choice(len(final_returns), size=MAX_PLOT_POINTS, replace=False)
+        
         # Set style
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
+        plt.rcParams.update({
+            'axes.grid': True,
+            'axes.prop_cycle': plt.cycler(color=plt.get_cmap('hsv')(np.linspace(0, 1, 6, endpoint=False))),
+        })
         
         # 1. Final Returns Distribution
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
@@ -225,22 +86,25 @@ def create_visualizations(
         axes[0, 1].grid(True, alpha=0.3)
         
         # Scatter plot: Returns vs Drawdown
-        axes[1, 0].scatter(max_drawdowns, final_returns, alpha=0.5, s=1)
+        axes[1, 0].scatter(max_drawdowns[point_idx], final_returns[point_idx], alpha=0.5, s=1)
         axes[1, 0].set_xlabel('Maximum Drawdown')
         axes[1, 0].set_ylabel('Final Return')
         axes[1, 0].set_title('Returns vs Drawdown')
         axes[1, 0].grid(True, alpha=0.3)
         
-        # Sample equity curves
-        sample_indices = np.random.choice(len(equity_curves), size=min(100, len(equity_curves)), replace=False)
-        for i in sample_indices:
-            axes[1, 1].plot(equity_curves[i], alpha=0.1, color='blue', linewidth=0.5)
+        # Sample equity curves (rows are already a random subset of simulations)
+        for curve in equity_curves[:100]:
+            axes[1, 1].plot(curve, alpha=0.1, color='blue', linewidth=0.5)
         
-        # Add percentile curves
+        # Add percentile curves over the sampled curves, in a single pass
         percentiles = [5, 25, 50, 75, 95]
         colors = ['red', 'orange', 'green', 'orange', 'red']
-        for p, color in zip(percentiles, colors):
-            curve = np.percentile(equity_curves, p, axis=0)
+        band_curves = equity_curves
+        if len(band_curves) > 2000:
+            band_idx = rng.choice(len(band_curves), size=2000, replace=False)
+            band_curves = band_curves[band_idx]
+        curves = np.quantile(band_curves, np.array(percentiles) / 100, axis=0, method='linear')
+        for p, color, curve in zip(percentiles, colors, curves):
             axes[1, 1].plot(curve, color=color, linewidth=2, label=f'{p}th percentile')
         
         axes[1, 1].set_xlabel('Trade Number')
@@ -257,13 +121,17 @@ def create_visualizations(
         fig, axes = plt.subplots(1, 2, figsize=(15, 6))
         
         # QQ plot for returns
-        stats.probplot(final_returns, dist="norm", plot=axes[0])
+        stats.probplot(final_returns[point_idx], dist="norm", plot=axes[0])
         axes[0].set_title('Q-Q Plot: Final Returns vs Normal Distribution')
         axes[0].grid(True, alpha=0.3)
         
         # Drawdown probability plot
         drawdown_thresholds = np.arange(-1, -20, -1)
-        probabilities = [np.mean(max_drawdowns <= threshold) * 100 for threshold in drawdown_thresholds]
+        sorted_drawdowns = np.sort(max_drawdowns)
+        probabilities = (
+            np.searchsorted(sorted_drawdowns, drawdown_thresholds, side='right')
+            / sorted_drawdowns.size * 100
+        )
         
         axes[1].plot(-drawdown_thresholds, probabilities, marker='o', linewidth=2, markersize=6)
         axes[1].set_xlabel('Drawdown Threshold (R-multiples)')
@@ -320,6 +188,32 @@ def main():
         help="Skip generating plots"
     )
     
+    parser.add_argument(
+        "--final-only",
+        action="store_true",
+        help="Only simulate final return and win rate via multinomial weights (no drawdowns or plots)"
+    )
+    
+    parser.add_argument(
+        "--device",
+        choices=["cpu", "cuda"],
+        default="cpu",
+        help="Run the simulation on CPU or on a CUDA GPU (requires cupy)"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=f"Worker processes to split simulations across (up to {os.cpu_count()} CPUs)"
+    )
+    
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed for reproducible simulations"
+    )
+    
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -335,19 +229,15 @@ def main():
     try:
         # Load trade data
         logger.info(f"Loading trade data from: {args.trades}")
-        df = load_trade_data(args.trades)
+        returns = load_returns(args.trades)
         
-        # Prepare returns data
-        returns = prepare_returns_data(df)
-        
-        # Run Monte Carlo simulation
-        final_returns, max_drawdowns, equity_curves = run_monte_carlo_simulation(
-            returns, args.simulations, args.trades_per_sim
+        # Run Monte Carlo simulation and analyze results
+        results, final_returns, max_drawdowns, equity_curves = run_bootstrap(
+            returns, args.simulations, args.trades_per_sim,
+            num_curves=0 if args.no_plots else 500, device=args.device,
+            workers=args.workers, final_only=args.final_only, seed=args.seed
         )
         
-        # Analyze results
-        results = analyze_simulation_results(final_returns, max_drawdowns, returns)
-        
         # Print results
         logger.info("\n" + "="*60)
         logger.info("MONTE CARLO SIMULATION RESULTS")
@@ -366,17 +256,26 @@ def main():
         logger.info(f"  Probability of Positive Return: {results.get('prob_positive_return', 0):.1f}%")
         logger.info("")
         
-        logger.info("DRAWDOWN STATISTICS:")
-        logger.info(f"  Mean Max Drawdown: {results.get('max_drawdown_mean', 0):.3f}")
-        logger.info(f"  Median Max Drawdown: {results.get('max_drawdown_median', 0):.3f}")
-        logger.info(f"  5th Percentile (Worst): {results.get('max_drawdown_5th_percentile', 0):.3f}")
-        
-        if 'prob_drawdown_gt_3R' in results:
-            logger.info(f"  Probability of Drawdown > 3R: {results['prob_drawdown_gt_3R']:.1f}%")
-            logger.info(f"  Probability of Drawdown > 5R: {results['prob_drawdown_gt_5R']:.1f}%")
-            logger.info(f"  Probability of Drawdown > 10R: {results['prob_drawdown_gt_10R']:.1f}%")
+        if 'win_rate_mean' in results:
+            logger.info("WIN RATE STATISTICS:")
+            logger.info(f"  Mean: {results['win_rate_mean']:.1f}%")
+            logger.info(f"  5th Percentile: {results['win_rate_5th_percentile']:.1f}%")
+            logger.info(f"  95th Percentile: {results['win_rate_95th_percentile']:.1f}%")
+            logger.info("")
+        
+        if max_drawdowns is not None:
+            logger.info("DRAWDOWN STATISTICS:")
+            logger.info(f"  Mean Max Drawdown: {results.get('max_drawdown_mean', 0):.3f}")
+            logger.info(f"  Median Max Drawdown: {results.get('max_drawdown_median', 0):.3f}")
+            logger.info(f"  5th Percentile (Worst): {results.get('max_drawdown_5th_percentile', 0):.3f}")
+            
+            if 'prob_drawdown_gt_3R' in results:
+                logger.info(f"  Probability of Drawdown > 3R: {results['prob_drawdown_gt_3R']:.1f}%")
+                logger.info(f"  Probability of Drawdown > 5R: {results['prob_drawdown_gt_5R']:.1f}%")
+                logger.info(f"  Probability of Drawdown > 10R: {results['prob_drawdown_gt_10R']:.1f}%")
+            
+            logger.info("")
         
-        logger.info("")
         logger.info("RISK METRICS:")
         logger.info(f"  VaR (5%): {results.get('var_5_percent', 0):.3f}")
         logger.info(f"  VaR (1%): {results.get('var_1_percent', 0):.3f}")
@@ -386,14 +285,23 @@ def main():
         output_path = Path(args.output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        # orjson serializes the numpy scalars in results directly
         results_file = output_path / 'monte_carlo_results.json'
-        import json
-        with open(results_file, 'w') as f:
-            json.dump(results, f, indent=2)
+        results_file.write_bytes(
+            orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+        )
         logger.info(f"Results saved to: {results_file}")
         
+        # Per-simulation results, for reloading without re-running
+        raw_file = output_path / 'monte_carlo_results.npz'
+        raw_results = {'final_return': final_returns}
+        if max_drawdowns is not None:
+            raw_results['max_drawdown'] = max_drawdowns
+        np.savez_compressed(raw_file, **raw_results)
+        logger.info(f"Per-simulation results saved to: {raw_file}")
+        
         # Create visualizations
-        if not args.no_plots:
+        if not args.no_plots and not args.final_only:
             logger.info("Creating visualizations...")
             create_visualizations(final_returns, max_drawdowns, equity_curves, args.output_dir)
         
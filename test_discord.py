@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
 """Test Discord webhook connectivity"""
 
-import requests
-import json
+import asyncio
+import os
 from datetime import datetime
 
+import httpx
+from dotenv import load_dotenv
+
+
+async def send_discord_webhook(webhook_url: str, data: dict) -> httpx.Response:
+    """Post a payload to a Discord webhook over a pooled async client"""
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=4)
+    ) as client:
+        return await client.post(webhook_url, json=data)
+
+
 def test_discord_webhook():
-    webhook_url = 'https://discord.com/api/webhooks/1398566969795416064/mjEtq_BoHhIys1TIEdy7IWuGfl-YMyxIbZNztf65MTJQgAytF-FfTEWdKBey7MetlTpq'
+    load_dotenv()
+    webhook_url = os.environ.get('DISCORD_WEBHOOK_URL')
+    
+    # No webhook configured (e.g. CI): skip without touching the network
+    if not webhook_url:
+        print('⏭️  DISCORD_WEBHOOK_URL not set - skipping Discord webhook test')
+        return
     
     # Create test message
     data = {
@@ -26,7 +45,7 @@ def test_discord_webhook():
     
     try:
         # Send test message
-        response = requests.post(webhook_url, json=data)
+        response = asyncio.run(send_discord_webhook(webhook_url, data))
         print(f'Status Code: {response.status_code}')
         
         if response.status_code == 204:
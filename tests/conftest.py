@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the strategy tests
+
+The strategy, the sample data and each populate stage are built once per session,
+so the rolling-window indicator pass runs once instead of in every test.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "user_data" / "strategies"))
+
+from donchian_atr import DonchianATRTrend
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture(scope="session")
+def strategy():
+    """Create strategy instance for testing, shared across the session"""
+    return DonchianATRTrend({})
+
+
+@pytest.fixture(scope="session")
+def _warmup(strategy):
+    """Run a tiny frame through the populate methods once per session
+    
+    Any JIT-compiled indicator and signal kernels compile here (or load from their disk
+    cache) during fixture setup rather than inside whichever test happens to
+    populate first. Only the data fixtures pull it in, so `-m fast` tests skip it.
+    """
+    length = strategy.startup_candle_count + 5
+    # float32 like the stored test data, so compiled specialisations match
+    close = np.linspace(100.0, 110.0, length, dtype=np.float32)
+    frame = pd.DataFrame({
+        'date': pd.date_range('2020-01-01', periods=length, freq='1h'),
+        'open': close,
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': np.full(length, 1000.0, dtype=np.float32),
+    })
+    metadata = {'pair': 'WARMUP/USD'}
+    frame = strategy.populate_indicators(frame, metadata)
+    strategy.populate_exit_trend(strategy.populate_entry_trend(frame, metadata), metadata)
+
+
+def _load_ohlcv(length: int) -> pd.DataFrame:
+    """Load pre-generated OHLCV data (see tests/data/_generate.py)"""
+    data = np.load(DATA_DIR / f"ohlcv_{length}.npy", mmap_mode='r')
+    return pd.DataFrame({name: data[name] for name in data.dtype.names})
+
+
+@pytest.fixture(scope="session")
+def sample_dataframe():
+    """Create sample OHLCV dataframe for testing (shared, do not modify)"""
+    return _load_ohlcv(300)
+
+
+@pytest.fixture(scope="session")
+def pipeline_dataframe(_warmup):
+    """Longer trending OHLCV dataframe for the full pipeline test (shared, do not modify)"""
+    return _load_ohlcv(1000)
+
+
+@pytest.fixture(scope="session")
+def _indicators_df(strategy, sample_dataframe, _warmup):
+    """Sample dataframe with indicators populated, computed once per session"""
+    return strategy.populate_indicators(sample_dataframe.copy(), {'pair': 'BTC/USD'})
+
+
+@pytest.fixture
+def indicators_df(_indicators_df):
+    """Sample dataframe with indicators populated (a fresh deep copy per test)"""
+    return _indicators_df.copy(deep=True)
+
+
+@pytest.fixture(scope="session")
+def entries_df(strategy, _indicators_df):
+    """Indicators plus entry signals, computed once per session (shared, do not modify)"""
+    return strategy.populate_entry_trend(_indicators_df.copy(), {'pair': 'BTC/USD'})
+
+
+@pytest.fixture(scope="session")
+def exits_df(strategy, entries_df):
+    """Indicators plus entry and exit signals, computed once per session (shared, do not modify)"""
+    return strategy.populate_exit_trend(entries_df.copy(), {'pair': 'BTC/USD'})
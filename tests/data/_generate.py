@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Generate the synthetic OHLCV test data
+
+Writes ohlcv_300.npy (the shared sample frame) and ohlcv_1000.npy (the
+integration pipeline frame) next to this file as structured arrays, so the
+tests load them instead of regenerating random data on every run.
+
+Usage:
+    python tests/data/_generate.py
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent
+
+# Prices and volume as float32: the tests don't need double precision, and it
+# halves the bytes every indicator and assertion pass reads
+OHLCV_DTYPE = np.dtype([
+    ('date', 'datetime64[ns]'),
+    ('open', 'f4'),
+    ('high', 'f4'),
+    ('low', 'f4'),
+    ('close', 'f4'),
+    ('volume', 'f4'),
+])
+
+
+def _compound_in_place(returns: np.ndarray, base_price: float) -> np.ndarray:
+    """Turn per-bar returns into a price path, reusing the returns buffer"""
+    np.log1p(returns, out=returns)
+    np.cumsum(returns, out=returns)
+    np.exp(returns, out=returns)
+    returns *= base_price
+    return returns
+
+
+def _normal_into(rng: np.random.Generator, sigma: float, out: np.ndarray) -> np.ndarray:
+    """Fill out with N(0, sigma) draws without allocating"""
+    rng.standard_normal(out=out)
+    out *= sigma
+    return out
+
+
+def _apply_wick(prices: np.ndarray, rng: np.random.Generator, sigma: float,
+                sign: float, tmp: np.ndarray, out: np.ndarray) -> None:
+    """Write prices * (1 + sign * |N(0, sigma)|) into out via the tmp buffer"""
+    np.abs(_normal_into(rng, sigma, tmp), out=tmp)
+    tmp *= sign
+    tmp += 1.0
+    np.multiply(prices, tmp, out=out)
+
+
+def make_sample_ohlcv(length: int = 300) -> np.ndarray:
+    """Sample OHLCV data with a mild uptrend"""
+    rng = np.random.default_rng(42)  # Local generator for reproducible tests
+    
+    data = np.empty(length, dtype=OHLCV_DTYPE)
+    data['date'] = pd.date_range('2023-01-01', periods=length, freq='1h')
+    
+    # Create realistic OHLCV data with some trends
+    base_price = 50000
+    returns = _normal_into(rng, 0.02, np.empty(length))  # 2% volatility
+    
+    # Add some trend, enough for a few Donchian breakouts above the EMA filter
+    returns += np.linspace(0, 0.5 / length, length)
+    
+    # Compound in place: base * cumprod(1 + r) == base * exp(cumsum(log1p(r)))
+    prices = _compound_in_place(returns, base_price)
+    
+    # One scratch buffer for the wick noise, results written straight into the fields
+    tmp = np.empty(length)
+    _apply_wick(prices, rng, 0.005, 1.0, tmp, data['high'])
+    _apply_wick(prices, rng, 0.005, -1.0, tmp, data['low'])
+    # Open jitters around the close by 0.1% of price
+    _normal_into(rng, 0.001, tmp)
+    tmp += 1.0
+    np.multiply(prices, tmp, out=data['open'])
+    data['close'] = prices
+    data['volume'] = rng.uniform(100, 1000, length)
+    
+    return data
+
+
+def make_pipeline_ohlcv(length: int = 1000) -> np.ndarray:
+    """Longer trending OHLCV data for the full pipeline test"""
+    rng = np.random.default_rng(123)
+    
+    data = np.empty(length, dtype=OHLCV_DTYPE)
+    data['date'] = pd.date_range('2023-01-01', periods=length, freq='1h')
+    
+    # Create trending market data
+    base_price = 45000
+    returns = _normal_into(rng, 0.015, np.empty(length))  # 1.5% noise
+    returns += np.linspace(0, 0.3 / length, length)  # 30% uptrend over period
+    
+    prices = _compound_in_place(returns, base_price)
+    
+    # Generate realistic OHLCV
+    tmp = np.empty(length)
+    _apply_wick(prices, rng, 0.003, 1.0, tmp, data['high'])
+    _apply_wick(prices, rng, 0.003, -1.0, tmp, data['low'])
+    data['open'][1:] = prices[:-1]  # Previous close as open
+    data['open'][0] = prices[0]
+    data['close'] = prices
+    data['volume'] = rng.lognormal(5, 1, length)  # Log-normal volume
+    
+    return data
+
+
+if __name__ == "__main__":
+    np.save(DATA_DIR / 'ohlcv_300.npy', make_sample_ohlcv(300))
+    np.save(DATA_DIR / 'ohlcv_1000.npy', make_pipeline_ohlcv(1000))
@@ -0,0 +1,88 @@
+"""
+Unit tests for the trade export (scripts/export_trades.py)
+
+Tests that the streamed and the in-memory CSV exports agree.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+
+from export_trades import (
+    calculate_r_multiples,
+    export_trades_from_db,
+    stream_trades_to_csv,
+    write_trades,
+)
+
+# (id, is_open, open_rate, close_rate, close_profit_abs, initial_stop_loss, open_date, close_date)
+# Newest first is the query order, so with chunksize=2 the first chunk has
+# no stop-loss trade and the second has one plus an open trade
+_TRADES = [
+    (1, 0, 100.0, 104.0, 4.0, 95.0, '2024-01-01 00:00:00', '2024-01-01 05:00:00'),
+    (2, 1, 100.0, None, None, 97.0, '2024-01-02 00:00:00', None),
+    (3, 0, 100.0, 98.0, -2.0, None, '2024-01-03 00:00:00', '2024-01-03 02:00:00'),
+    (4, 0, 100.0, 101.0, 1.0, 0.0, '2024-01-04 00:00:00', '2024-01-04 01:30:00'),
+]
+
+
+@pytest.fixture
+def trades_db():
+    """In-memory database with the trades table columns the export reads"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("""
+        CREATE TABLE trades (
+            id INTEGER, exchange TEXT, pair TEXT, is_open INTEGER, fee_open REAL,
+            fee_close REAL, open_rate REAL, close_rate REAL, amount REAL,
+            stake_amount REAL, close_profit REAL, close_profit_abs REAL,
+            sell_reason TEXT, strategy TEXT, enter_tag TEXT, timeframe INTEGER,
+            open_date TEXT, close_date TEXT, stop_loss REAL, initial_stop_loss REAL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO trades VALUES (?, 'coinbase', 'BTC/USD', ?, 0.001, 0.001, ?, ?, 1.0, "
+        "100.0, NULL, ?, NULL, 'DonchianATRTrend', NULL, 5, ?, ?, NULL, ?)",
+        [(i, is_open, open_rate, close_rate, profit, open_date, close_date, stop)
+         for i, is_open, open_rate, close_rate, profit, stop, open_date, close_date in _TRADES]
+    )
+    yield conn
+    conn.close()
+
+
+class TestExportTrades:
+    """Test cases for the trade export"""
+    
+    def test_stream_matches_full_export(self, trades_db, tmp_path):
+        """A streamed export in two chunks writes the same values as the full export"""
+        streamed_file = tmp_path / 'streamed.csv'
+        full_file = tmp_path / 'full.csv'
+        
+        num_trades = stream_trades_to_csv(None, str(streamed_file), chunksize=2, conn=trades_db)
+        write_trades(calculate_r_multiples(export_trades_from_db(None, trades_db)), str(full_file))
+        
+        streamed = pd.read_csv(streamed_file, parse_dates=['open_date', 'close_date'])
+        full = pd.read_csv(full_file, parse_dates=['open_date', 'close_date'])
+        
+        assert num_trades == len(_TRADES)
+        assert list(streamed.columns) == list(full.columns)
+        
+        # Closed trades without a stop still get r_multiple_stop = 0.0 in both
+        assert streamed.loc[streamed['id'] == 3, 'r_multiple_stop'].item() == 0.0
+        
+        for column in full.columns:
+            if pd.api.types.is_numeric_dtype(full[column]):
+                np.testing.assert_allclose(
+                    streamed[column].to_numpy(dtype=np.float64),
+                    full[column].to_numpy(dtype=np.float64),
+                    err_msg=column
+                )
+            else:
+                pd.testing.assert_series_equal(
+                    streamed[column], full[column], check_dtype=False, obj=column
+                )
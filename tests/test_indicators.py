@@ -10,6 +10,8 @@ import numpy as np
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
+from freqtrade.enums import RunMode
+
 # Import the strategy
 import sys
 from pathlib import Path
@@ -17,65 +19,53 @@ sys.path.append(str(Path(__file__).parent.parent / "user_data" / "strategies"))
 
 from donchian_atr import DonchianATRTrend
 
+# Fixed UTC timestamp for the callbacks: deterministic, and no clock read per call
+_FIXED_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Small ATR frames for the callback tests, built once at import
+_ATR_DF_NORMAL = pd.DataFrame({'atr': np.array([0.02, 0.025, 0.03])})  # 2-3% ATR
+_ATR_DF_INVALID = pd.DataFrame({'atr': np.array([np.nan, 0, -0.01])})
+_ATR_DF_VOLATILE = pd.DataFrame({'atr': np.array([3000.0, 3500.0, 4000.0])})  # Very high ATR (8% of price)
+
+
+@pytest.fixture(scope="class")
+def mock_dp():
+    """Dataframe provider mock restricted to the one method the strategy calls"""
+    return MagicMock(spec_set=['get_analyzed_dataframe'])
+
+
+@pytest.fixture(scope="class")
+def mock_trade():
+    """Trade mock restricted to the attributes the strategy reads"""
+    return MagicMock(spec_set=['open_rate'])
+
+
+@pytest.fixture
+def mock_dp_with_atr(request, strategy, mock_dp):
+    """Attach the mock dataframe provider returning an ATR frame (default: _ATR_DF_NORMAL)"""
+    mock_dp.get_analyzed_dataframe.return_value = (getattr(request, 'param', _ATR_DF_NORMAL), None)
+    strategy.dp = mock_dp
+    return mock_dp
+
 
 class TestDonchianATRTrend:
     """Test cases for DonchianATRTrend strategy"""
     
-    @pytest.fixture
-    def strategy(self):
-        """Create strategy instance for testing"""
-        return DonchianATRTrend()
-    
-    @pytest.fixture
-    def sample_dataframe(self):
-        """Create sample OHLCV dataframe for testing"""
-        np.random.seed(42)  # For reproducible tests
-        
-        dates = pd.date_range('2023-01-01', periods=300, freq='1H')
-        
-        # Create realistic OHLCV data with some trends
-        base_price = 50000
-        returns = np.random.normal(0, 0.02, len(dates))  # 2% volatility
-        
-        # Add some trend
-        trend = np.linspace(0, 0.1, len(dates))
-        returns += trend / len(dates)
-        
-        prices = base_price * np.cumprod(1 + returns)
-        
-        # Generate OHLC from prices
-        high = prices * (1 + np.abs(np.random.normal(0, 0.005, len(dates))))
-        low = prices * (1 - np.abs(np.random.normal(0, 0.005, len(dates))))
-        open_prices = prices + np.random.normal(0, prices * 0.001)
-        close_prices = prices
-        
-        volume = np.random.uniform(100, 1000, len(dates))
-        
-        df = pd.DataFrame({
-            'date': dates,
-            'open': open_prices,
-            'high': high,
-            'low': low,
-            'close': close_prices,
-            'volume': volume
-        })
-        
-        return df
-    
+    @pytest.mark.fast
     def test_strategy_initialization(self, strategy):
         """Test strategy initializes correctly"""
-        assert strategy.timeframe == '1h'
+        assert strategy.timeframe == '5m'
         assert strategy.can_short is False
-        assert strategy.startup_candle_count == 250
+        assert strategy.startup_candle_count == 300
         assert hasattr(strategy, 'don_len_entry')
         assert hasattr(strategy, 'don_len_exit')
         assert hasattr(strategy, 'ema_len')
         assert hasattr(strategy, 'atr_len')
         assert hasattr(strategy, 'atr_mult')
     
-    def test_populate_indicators(self, strategy, sample_dataframe):
+    def test_populate_indicators(self, indicators_df):
         """Test that indicators are calculated correctly"""
-        df = strategy.populate_indicators(sample_dataframe, {'pair': 'BTC/USD'})
+        df = indicators_df
         
         # Check that all required indicators are present
         required_indicators = [
@@ -93,92 +83,130 @@ class TestDonchianATRTrend:
         assert not df['ema'].isnull().all(), "EMA should not be all null"
         assert not df['rsi'].isnull().all(), "RSI should not be all null"
         
-        # Check Donchian channels are calculated correctly
+        # Check Donchian channels are calculated correctly, on plain ndarrays
+        # masked to the rows where the channel is defined
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        
         # Upper channel should be >= high prices
-        valid_upper = df['don_upper_entry'].dropna()
-        valid_high = df['high'][df['don_upper_entry'].notna()]
-        assert (valid_upper >= valid_high).all(), "Donchian upper should be >= high"
+        upper = df['don_upper_entry'].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(upper)
+        np.testing.assert_array_compare(
+            np.greater_equal, upper[valid], high[valid], err_msg="Donchian upper should be >= high"
+        )
         
-        # Lower channel should be <= low prices  
-        valid_lower = df['don_lower_entry'].dropna()
-        valid_low = df['low'][df['don_lower_entry'].notna()]
-        assert (valid_lower <= valid_low).all(), "Donchian lower should be <= low"
+        # Lower channel should be <= low prices
+        lower = df['don_lower_entry'].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(lower)
+        np.testing.assert_array_compare(
+            np.less_equal, lower[valid], low[valid], err_msg="Donchian lower should be <= low"
+        )
         
         # Mid line should be between upper and lower
-        valid_indices = ~(df['don_upper_exit'].isnull() | df['don_lower_exit'].isnull())
-        upper_exit = df.loc[valid_indices, 'don_upper_exit']
-        lower_exit = df.loc[valid_indices, 'don_lower_exit']  
-        mid_exit = df.loc[valid_indices, 'don_mid_exit']
+        upper_exit = df['don_upper_exit'].to_numpy(dtype=np.float64)
+        lower_exit = df['don_lower_exit'].to_numpy(dtype=np.float64)
+        mid_exit = df['don_mid_exit'].to_numpy(dtype=np.float64)
+        valid = ~(np.isnan(upper_exit) | np.isnan(lower_exit))
+        np.testing.assert_array_compare(
+            np.greater_equal, mid_exit[valid], lower_exit[valid],
+            err_msg="Donchian mid should be between upper and lower"
+        )
+        np.testing.assert_array_compare(
+            np.less_equal, mid_exit[valid], upper_exit[valid],
+            err_msg="Donchian mid should be between upper and lower"
+        )
+    
+    def test_populate_indicators_new_candles(self, strategy, sample_dataframe):
+        """Extending indicators over new candles matches a full recompute"""
+        columns = ['don_upper_entry', 'don_lower_entry', 'don_upper_exit',
+                   'don_lower_exit', 'don_mid_exit', 'volume_sma']
+        
+        # Slide a 250-candle window forward one candle at a time, as in live mode
+        with patch.dict(strategy.config, {'runmode': RunMode.DRY_RUN}):
+            for step in range(4):
+                window = sample_dataframe.iloc[step:step + 250].reset_index(drop=True)
+                extended = strategy.populate_indicators(window.copy(), {'pair': 'SLIDE/USD'})
+                # A pair with no previous frame forces the full computation
+                full = strategy.populate_indicators(window.copy(), {'pair': f'FULL{step}/USD'})
+                
+                # Max/min are exact; the moving mean may differ by summation rounding
+                for column in columns:
+                    np.testing.assert_allclose(
+                        extended[column].to_numpy(), full[column].to_numpy(), rtol=1e-12, err_msg=column
+                    )
+        
+        # Outside dry-run/live each pair is analysed once, so no tail state is kept
+        strategy.populate_indicators(sample_dataframe.copy(), {'pair': 'BACKTEST/USD'})
+        assert not any(key[0] == 'BACKTEST/USD' for key in strategy._last_windowed)
+    
+    def test_prefetch_indicators(self, strategy, sample_dataframe, pipeline_dataframe):
+        """Indicators prefetched on the thread pool are served to populate_indicators"""
+        frames = {'PREFETCH1/USD': sample_dataframe, 'PREFETCH2/USD': pipeline_dataframe}
+        mock_dp = MagicMock(spec_set=['ohlcv'])
+        mock_dp.ohlcv.side_effect = lambda pair, *args, **kwargs: frames[pair]
+        strategy.dp = mock_dp
         
-        assert ((mid_exit >= lower_exit) & (mid_exit <= upper_exit)).all(), \
-            "Donchian mid should be between upper and lower"
+        with patch.dict(strategy.config, {'runmode': RunMode.DRY_RUN}):
+            strategy._prefetch_indicators(list(frames))
+            
+            # Both pairs must now come from the cache without recomputing
+            with patch.object(strategy, '_compute_indicators', side_effect=AssertionError):
+                for pair, frame in frames.items():
+                    df = strategy.populate_indicators(frame.copy(), {'pair': pair})
+                    assert len(df) == len(frame)
+                    assert df['atr'].notna().any()
+        
+        # A backtest analyses each pair once, so nothing is cached for it
+        cached = len(strategy._indicator_cache)
+        strategy.populate_indicators(sample_dataframe.copy(), {'pair': 'BACKTEST/USD'})
+        assert len(strategy._indicator_cache) == cached
     
-    def test_populate_entry_trend(self, strategy, sample_dataframe):
+    def test_populate_entry_trend(self, entries_df):
         """Test entry signal generation"""
-        # First populate indicators
-        df = strategy.populate_indicators(sample_dataframe, {'pair': 'BTC/USD'})
-        
-        # Then populate entry signals
-        df = strategy.populate_entry_trend(df, {'pair': 'BTC/USD'})
+        df = entries_df
         
         # Check that enter_long column exists
         assert 'enter_long' in df.columns
         
-        # Check that signals are binary (0 or 1)
-        entry_values = df['enter_long'].dropna().unique()
-        assert all(val in [0, 1] for val in entry_values), "Entry signals should be 0 or 1"
+        # Check that signals are binary (0 or 1); unset rows may be NaN
+        entries = df['enter_long'].to_numpy(dtype=np.float64)
+        assert np.isin(entries[~np.isnan(entries)], (0, 1)).all(), "Entry signals should be 0 or 1"
         
-        # Check that we have some entry signals (not all zeros)
-        assert df['enter_long'].sum() > 0, "Should have at least some entry signals"
+        # Check that we have some entry signals (not all zeros); any() stops at the first one
+        is_entry = entries == 1
+        assert is_entry.any(), "Should have at least some entry signals"
         
         # Verify entry logic: entry signals should occur when close > don_upper_entry
-        entry_signals = df[df['enter_long'] == 1]
-        if len(entry_signals) > 0:
-            # Note: We shift don_upper_entry by 1 in the strategy
-            prev_upper = df['don_upper_entry'].shift(1)
-            entry_closes = entry_signals['close']
-            entry_indices = entry_signals.index
-            prev_upper_at_entry = prev_upper.loc[entry_indices]
+        if is_entry.any():
+            # Note: We shift don_upper_entry by 1 in the strategy, so compare each
+            # entry close against the previous candle's upper band
+            closes = df['close'].to_numpy()
+            upper = df['don_upper_entry'].to_numpy()
+            entry_after_first = is_entry[1:]
             
             # Should be mostly true (allowing for some noise due to other conditions)
-            breakout_condition = entry_closes > prev_upper_at_entry
-            assert breakout_condition.sum() / len(breakout_condition) > 0.8, \
+            breakout_condition = closes[1:][entry_after_first] > upper[:-1][entry_after_first]
+            assert breakout_condition.mean() > 0.8, \
                 "Most entry signals should occur on Donchian breakouts"
     
-    def test_populate_exit_trend(self, strategy, sample_dataframe):
+    def test_populate_exit_trend(self, exits_df):
         """Test exit signal generation"""
-        # Populate indicators and entry signals first
-        df = strategy.populate_indicators(sample_dataframe, {'pair': 'BTC/USD'})
-        df = strategy.populate_entry_trend(df, {'pair': 'BTC/USD'})
-        
-        # Then populate exit signals
-        df = strategy.populate_exit_trend(df, {'pair': 'BTC/USD'})
+        df = exits_df
         
         # Check that exit_long column exists
         assert 'exit_long' in df.columns
         
-        # Check that signals are binary (0 or 1)
-        exit_values = df['exit_long'].dropna().unique()
-        assert all(val in [0, 1] for val in exit_values), "Exit signals should be 0 or 1"
+        # Check that signals are binary (0 or 1); unset rows may be NaN
+        exits = df['exit_long'].to_numpy(dtype=np.float64)
+        assert np.isin(exits[~np.isnan(exits)], (0, 1)).all(), "Exit signals should be 0 or 1"
     
     @patch('user_data.strategies.donchian_atr.logger')
-    def test_custom_stake_amount(self, mock_logger, strategy):
+    def test_custom_stake_amount(self, mock_logger, strategy, mock_dp_with_atr):
         """Test custom stake amount calculation"""
-        # Mock the dataframe provider
-        mock_dp = MagicMock()
-        strategy.dp = mock_dp
-        
-        # Create sample dataframe with ATR
-        df = pd.DataFrame({
-            'atr': [0.02, 0.025, 0.03]  # 2-3% ATR
-        })
-        
-        mock_dp.get_analyzed_dataframe.return_value = (df, None)
-        
         # Test calculation
         stake = strategy.custom_stake_amount(
             pair='BTC/USD',
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             current_rate=50000,
             proposed_stake=100,
             min_stake=10,
@@ -195,18 +223,14 @@ class TestDonchianATRTrend:
         assert stake > 0
         assert abs(stake - expected_stake) < 0.01, f"Expected {expected_stake}, got {stake}"
     
-    def test_custom_stake_amount_edge_cases(self, strategy):
+    def test_custom_stake_amount_edge_cases(self, strategy, mock_dp_with_atr):
         """Test custom stake amount with edge cases"""
-        # Mock dataframe provider
-        mock_dp = MagicMock()
-        strategy.dp = mock_dp
-        
         # Test with no dataframe
-        mock_dp.get_analyzed_dataframe.return_value = (None, None)
+        mock_dp_with_atr.get_analyzed_dataframe.return_value = (None, None)
         
         stake = strategy.custom_stake_amount(
             pair='BTC/USD',
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             current_rate=50000,
             proposed_stake=100,
             min_stake=10,
@@ -220,12 +244,11 @@ class TestDonchianATRTrend:
         assert stake == 100
         
         # Test with invalid ATR
-        df = pd.DataFrame({'atr': [np.nan, 0, -0.01]})
-        mock_dp.get_analyzed_dataframe.return_value = (df, None)
+        mock_dp_with_atr.get_analyzed_dataframe.return_value = (_ATR_DF_INVALID, None)
         
         stake = strategy.custom_stake_amount(
             pair='BTC/USD',
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             current_rate=50000,
             proposed_stake=100,
             min_stake=10,
@@ -238,21 +261,8 @@ class TestDonchianATRTrend:
         # Should return proposed stake when ATR is invalid
         assert stake == 100
     
-    def test_custom_stoploss(self, strategy):
+    def test_custom_stoploss(self, strategy, mock_dp_with_atr, mock_trade):
         """Test custom stoploss calculation"""
-        # Mock dataframe provider
-        mock_dp = MagicMock()
-        strategy.dp = mock_dp
-        
-        # Sample dataframe with ATR
-        df = pd.DataFrame({
-            'atr': [0.02, 0.025, 0.03]
-        })
-        
-        mock_dp.get_analyzed_dataframe.return_value = (df, None)
-        
-        # Mock trade object
-        mock_trade = MagicMock()
         mock_trade.open_rate = 50000
         
         current_rate = 51000  # 2% profit
@@ -260,7 +270,7 @@ class TestDonchianATRTrend:
         stoploss_ratio = strategy.custom_stoploss(
             pair='BTC/USD',
             trade=mock_trade,
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             current_rate=current_rate,
             current_profit=0.02
         )
@@ -279,59 +289,51 @@ class TestDonchianATRTrend:
         
         assert abs(stoploss_ratio - expected_ratio) < 0.001
     
-    def test_confirm_trade_entry(self, strategy):
+    @pytest.mark.parametrize(
+        'mock_dp_with_atr', [_ATR_DF_NORMAL, _ATR_DF_VOLATILE], ids=['normal', 'volatile'], indirect=True
+    )
+    def test_confirm_trade_entry(self, strategy, mock_dp_with_atr):
         """Test trade entry confirmation"""
-        # Mock dataframe provider
-        mock_dp = MagicMock()
-        strategy.dp = mock_dp
-        
-        # Valid dataframe with good ATR
-        df = pd.DataFrame({
-            'atr': [0.02, 0.025, 0.03]
-        })
-        
-        mock_dp.get_analyzed_dataframe.return_value = (df, None)
-        
-        # Should confirm entry with valid conditions
+        # Should confirm entry with valid conditions; extreme volatility still
+        # confirms but logs a warning
         confirmed = strategy.confirm_trade_entry(
             pair='BTC/USD',
             order_type='limit',
             amount=0.001,
             rate=50000,
             time_in_force='GTC',
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             entry_tag=None,
             side='long'
         )
         
         assert confirmed is True
-        
-        # Test with extreme volatility
-        df_volatile = pd.DataFrame({
-            'atr': [3000, 3500, 4000]  # Very high ATR (8% of price)
-        })
-        
-        mock_dp.get_analyzed_dataframe.return_value = (df_volatile, None)
-        
-        # Should still confirm but log warning
-        confirmed = strategy.confirm_trade_entry(
-            pair='BTC/USD',
-            order_type='limit',
-            amount=0.001,
-            rate=50000,
-            time_in_force='GTC',
-            current_time=datetime.now(timezone.utc),
-            entry_tag=None,
-            side='long'
-        )
-        
-        assert confirmed is True  # Still allows trade but logs warning
     
+    def test_bot_start_primes_kernels(self, strategy, pipeline_dataframe):
+        """bot_start compiles the kernel specialisations live float64 frames use"""
+        import donchian_atr
+        if donchian_atr.njit is None:
+            pytest.skip("numba not installed")
+        
+        strategy.bot_start()
+        kernels = (donchian_atr._ema, donchian_atr._atr_macd_rsi,
+                   donchian_atr._entry_mask, donchian_atr._exit_mask)
+        compiled = [len(kernel.signatures) for kernel in kernels]
+        
+        # Live candles are float64; running them through must not compile anything new
+        frame = pipeline_dataframe.astype({c: np.float64 for c in ['open', 'high', 'low', 'close', 'volume']})
+        metadata = {'pair': 'PRIMED/USD'}
+        df = strategy.populate_indicators(frame, metadata)
+        strategy.populate_exit_trend(strategy.populate_entry_trend(df, metadata), metadata)
+        
+        assert [len(kernel.signatures) for kernel in kernels] == compiled
+    
+    @pytest.mark.fast
     def test_leverage(self, strategy):
         """Test leverage method returns 1.0 (no leverage)"""
         leverage = strategy.leverage(
             pair='BTC/USD',
-            current_time=datetime.now(timezone.utc),
+            current_time=_FIXED_NOW,
             current_rate=50000,
             proposed_leverage=2.0,
             max_leverage=5.0,
@@ -343,63 +345,30 @@ class TestDonchianATRTrend:
     
     def test_hyperopt_parameters(self, strategy):
         """Test hyperopt parameters definition"""
-        from unittest.mock import Mock
-        
-        # Mock the space module
-        mock_space = Mock()
-        mock_space.Integer = Mock(return_value='integer_space')
-        mock_space.Real = Mock(return_value='real_space')
+        space = pytest.importorskip("skopt.space")
         
-        params = strategy.hyperopt_parameters(mock_space)
+        params = strategy.hyperopt_parameters(space)
         
         # Check that all expected parameters are defined
         expected_params = ['don_len_entry', 'don_len_exit', 'ema_len', 'atr_mult']
         for param in expected_params:
             assert param in params
         
-        # Check that Integer and Real were called appropriately
-        assert mock_space.Integer.call_count >= 3  # At least 3 integer parameters
-        assert mock_space.Real.call_count >= 1     # At least 1 real parameter
+        # The method builds its dimensions from skopt.space itself
+        values = list(params.values())
+        assert sum(isinstance(v, space.Integer) for v in values) >= 3  # At least 3 integer parameters
+        assert sum(isinstance(v, space.Real) for v in values) >= 1     # At least 1 real parameter
 
 
 # Integration tests
 class TestStrategyIntegration:
     """Integration tests with more realistic scenarios"""
     
-    @pytest.fixture
-    def strategy(self):
-        return DonchianATRTrend()
-    
-    def test_full_indicator_pipeline(self, strategy):
+    @pytest.mark.slow
+    def test_full_indicator_pipeline(self, strategy, pipeline_dataframe):
         """Test the full indicator calculation pipeline"""
-        # Create a longer, more realistic dataset
-        np.random.seed(123)
-        dates = pd.date_range('2023-01-01', periods=1000, freq='1H')
-        
-        # Create trending market data
-        base_price = 45000
-        trend = np.linspace(0, 0.3, len(dates))  # 30% uptrend over period
-        noise = np.random.normal(0, 0.015, len(dates))  # 1.5% noise
-        
-        returns = trend/len(dates) + noise
-        prices = base_price * np.cumprod(1 + returns)
-        
-        # Generate realistic OHLCV
-        high = prices * (1 + np.abs(np.random.normal(0, 0.003, len(dates))))
-        low = prices * (1 - np.abs(np.random.normal(0, 0.003, len(dates))))
-        open_prices = np.roll(prices, 1)  # Previous close as open
-        open_prices[0] = prices[0]
-        
-        volume = np.random.lognormal(5, 1, len(dates))  # Log-normal volume
-        
-        df = pd.DataFrame({
-            'date': dates,
-            'open': open_prices,
-            'high': high,
-            'low': low,
-            'close': prices,
-            'volume': volume
-        })
+        # A longer, more realistic trending dataset
+        df = pipeline_dataframe.copy()
         
         # Run full pipeline
         df = strategy.populate_indicators(df, {'pair': 'BTC/USD'})
@@ -408,20 +377,20 @@ class TestStrategyIntegration:
         
         # Validate results
         assert len(df) == 1000
-        assert df['enter_long'].sum() > 0, "Should generate some entry signals"
-        assert df['exit_long'].sum() > 0, "Should generate some exit signals"
+        assert np.any(df['enter_long'].to_numpy() == 1), "Should generate some entry signals"
+        assert np.any(df['exit_long'].to_numpy() == 1), "Should generate some exit signals"
         
         # Check signal quality
         entry_signals = df[df['enter_long'] == 1]
         if len(entry_signals) > 5:  # If we have enough signals
             # Entry signals should generally occur during uptrends
-            entry_prices = entry_signals['close']
-            price_changes = entry_prices.pct_change(20).dropna()  # 20-period change
-            uptrend_entries = (price_changes > 0).sum()
-            
-            # At least 60% of entries should be in uptrending periods
-            assert uptrend_entries / len(price_changes) > 0.6, \
-                "Most entries should occur during uptrends"
+            entry_prices = entry_signals['close'].to_numpy()
+            if len(entry_prices) > 20:
+                price_changes = entry_prices[20:] / entry_prices[:-20] - 1.0  # 20-period change
+                
+                # At least 60% of entries should be in uptrending periods
+                assert np.count_nonzero(price_changes > 0) > 0.6 * len(price_changes), \
+                    "Most entries should occur during uptrends"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""
+Unit tests for the Monte Carlo core (scripts/mc_core.py)
+
+Tests the simulation paths that in-process callers (notebooks, other scripts)
+run back to back.
+"""
+
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+sys.path.append(str(SCRIPTS_DIR))
+
+from mc_core import run_bootstrap
+
+
+class TestMonteCarloCore:
+    """Test cases for mc_core"""
+    
+    def test_win_rates_match_multinomial(self):
+        """The path bootstrap reports the same win rate statistics as the multinomial one"""
+        returns = np.random.default_rng(0).normal(0.1, 1.0, 300).astype(np.float32)
+        
+        path_results, *_ = run_bootstrap(returns, 5000, num_curves=0, seed=1)
+        multinomial_results, *_ = run_bootstrap(returns, 5000, final_only=True, seed=1)
+        
+        assert path_results['win_rate_mean'] == pytest.approx(np.mean(returns > 0) * 100, abs=0.5)
+        for key in ('win_rate_mean', 'win_rate_5th_percentile', 'win_rate_95th_percentile'):
+            assert path_results[key] == pytest.approx(multinomial_results[key], abs=1.0)
+    
+    @pytest.mark.slow
+    def test_workers_after_jit_kernel_exits(self):
+        """A worker-pool run after the parallel JIT kernel finishes and exits cleanly"""
+        # Run in a fresh interpreter: the failure mode is a hang at interpreter exit
+        script = textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {str(SCRIPTS_DIR)!r})
+            import numpy as np
+            from mc_core import run_bootstrap
+            
+            if __name__ == "__main__":
+                returns = np.random.default_rng(0).normal(0.1, 1.0, 200)
+                serial, *_ = run_bootstrap(returns, 2000, num_curves=10, workers=1, seed=1)
+                pooled, *_ = run_bootstrap(returns, 2000, num_curves=10, workers=2, seed=1)
+                assert serial and pooled
+        """)
+        
+        completed = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, timeout=60
+        )
+        
+        assert completed.returncode == 0, completed.stderr
@@ -12,18 +12,185 @@ Date: 2025-01-25
 """
 
 import logging
+import math
 import os
-from typing import Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+import bottleneck as bn
 import numpy as np
-import pandas as pd
-import talib.abstract as ta
+import talib
+from freqtrade.enums import CandleType, RunMode
 from freqtrade.strategy import IStrategy, merge_informative_pair
 from pandas import DataFrame
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 
+if njit is not None:
+    # The kernels read the candles in their own dtype and write float32 columns,
+    # halving the bytes stored and streamed by later passes, but accumulate in
+    # float64 so long series don't drift. They release the GIL, so several pairs
+    # can be computed on threads at once (see DonchianATRTrend.analyze).
+    
+    @njit(cache=True, nogil=True, inline='always')
+    def _true_range(high, low, close, i):
+        """True range of bar i against the previous close, in float64."""
+        h = np.float64(high[i])
+        l = np.float64(low[i])
+        c = np.float64(close[i - 1])
+        return max(h - l, abs(h - c), abs(l - c))
+    
+    @njit(cache=True, nogil=True)
+    def _ema(values, period):
+        """
+        EMA in one pass, matching talib.EMA: seeded with the SMA of the first
+        period values, then ema = alpha * x + (1 - alpha) * ema.
+        """
+        n = values.size
+        out = np.full(n, np.nan, dtype=np.float32)
+        if n < period:
+            return out
+        alpha = 2.0 / (period + 1)
+        ema = 0.0
+        for i in range(period):
+            ema += np.float64(values[i])
+        ema /= period
+        out[period - 1] = ema
+        for i in range(period, n):
+            ema = alpha * np.float64(values[i]) + (1.0 - alpha) * ema
+            out[i] = ema
+        return out
+    
+    @njit(cache=True, nogil=True)
+    def _atr_macd_rsi(high, low, close, atr_period, fast, slow, signal, rsi_period):
+        """
+        ATR, MACD (line, signal, histogram) and RSI in one pass over the candles,
+        matching talib.ATR, talib.MACD and talib.RSI. The independent recurrences
+        share the loop, so their dependency chains overlap instead of running
+        back to back in separate passes.
+        
+        ATR is the mean true range of bars 1..atr_period at index atr_period,
+        then follows Wilder's RMA; the true range is computed inline.
+        
+        As in TA-Lib, both MACD EMAs start at index slow - 1: the slow one seeded
+        with the SMA of the first slow closes, the fast one with the SMA of the
+        fast closes ending there. The signal EMA is seeded with the SMA of the
+        first signal MACD values, which is where all three outputs start. RSI
+        averages the first rsi_period gains/losses, then applies Wilder smoothing.
+        """
+        n = close.size
+        atr_out = np.full(n, np.nan, dtype=np.float32)
+        macd = np.full(n, np.nan, dtype=np.float32)
+        macdsignal = np.full(n, np.nan, dtype=np.float32)
+        macdhist = np.full(n, np.nan, dtype=np.float32)
+        rsi = np.full(n, np.nan, dtype=np.float32)
+        
+        k_fast = 2.0 / (fast + 1)
+        k_slow = 2.0 / (slow + 1)
+        k_signal = 2.0 / (signal + 1)
+        start = slow - 1
+        first = start + signal - 1
+        fast_ema = 0.0
+        slow_ema = 0.0
+        signal_ema = 0.0
+        avg_gain = 0.0
+        avg_loss = 0.0
+        atr = 0.0
+        prev = 0.0
+        
+        for i in range(n):
+            x = np.float64(close[i])
+            
+            if i > 0:
+                tr = _true_range(high, low, close, i)
+                if i <= atr_period:
+                    atr += tr
+                    if i == atr_period:
+                        atr /= atr_period
+                        atr_out[i] = atr
+                else:
+                    atr = (atr * (atr_period - 1) + tr) / atr_period
+                    atr_out[i] = atr
+            
+            if i < start:
+                slow_ema += x
+                if i > start - fast:
+                    fast_ema += x
+            elif i == start:
+                slow_ema = (slow_ema + x) / slow
+                fast_ema = (fast_ema + x) / fast
+            else:
+                slow_ema += (x - slow_ema) * k_slow
+                fast_ema += (x - fast_ema) * k_fast
+            
+            if i >= start:
+                line = fast_ema - slow_ema
+                if i < first:
+                    signal_ema += line
+                elif i == first:
+                    signal_ema = (signal_ema + line) / signal
+                else:
+                    signal_ema += (line - signal_ema) * k_signal
+                if i >= first:
+                    macd[i] = line
+                    macdsignal[i] = signal_ema
+                    macdhist[i] = line - signal_ema
+            
+            if i > 0:
+                change = x - prev
+                gain = change if change > 0.0 else 0.0
+                loss = -change if change < 0.0 else 0.0
+                if i <= rsi_period:
+                    avg_gain += gain
+                    avg_loss += loss
+                    if i == rsi_period:
+                        avg_gain /= rsi_period
+                        avg_loss /= rsi_period
+                else:
+                    avg_gain = (avg_gain * (rsi_period - 1) + gain) / rsi_period
+                    avg_loss = (avg_loss * (rsi_period - 1) + loss) / rsi_period
+                if i >= rsi_period:
+                    total = avg_gain + avg_loss
+                    rsi[i] = 100.0 * avg_gain / total if abs(total) >= 1e-8 else 0.0
+            prev = x
+        
+        return atr_out, macd, macdsignal, macdhist, rsi
+    
+    @njit(cache=True, nogil=True)
+    def _entry_mask(close, upper_prev, ema, volume, volume_sma, rsi, macd, macdsignal):
+        """
+        Entry conditions ANDed per candle in one scan, as populate_entry_trend's
+        array path (comparisons with NaN are false, so warm-up candles never enter).
+        """
+        n = close.size
+        out = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            out[i] = ((close[i] > upper_prev[i]) & (close[i] > ema[i])
+                      & (volume[i] > volume_sma[i]) & (rsi[i] < 75.0)
+                      & (macd[i] > macdsignal[i]))
+        return out
+    
+    @njit(cache=True, nogil=True)
+    def _exit_mask(close, mid_exit, rsi, macd, macdsignal):
+        """
+        Exit conditions ORed per candle in one scan, as populate_exit_trend's
+        array path, the MACD bearish cross reading the previous candle directly.
+        """
+        n = close.size
+        out = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            bear = i > 0 and macd[i] < macdsignal[i] and macd[i - 1] >= macdsignal[i - 1]
+            out[i] = (close[i] < mid_exit[i]) | (rsi[i] > 80.0) | bear
+        return out
+
+
 class DonchianATRTrend(IStrategy):
     """
     Trend-following breakout strategy using Donchian channels and ATR sizing
@@ -109,95 +276,319 @@ class DonchianATRTrend(IStrategy):
     r_usd = float(os.getenv('RISK_UNIT_USD', '5.0'))
     max_daily_loss_r = float(os.getenv('MAX_DAILY_LOSS_R', '2.0'))
     
-    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+    # Indicator arrays keyed by the candles and parameters they depend on, shared
+    # across instances so re-analysed candles (dry-run/live, or hyperopt with
+    # analyze_per_epoch when only atr_mult changes) skip the recompute
+    _indicator_cache: 'OrderedDict[tuple, Dict[str, np.ndarray]]' = OrderedDict()
+    _indicator_cache_size = 64
+    
+    # Last frame's candles, window sources and rolling-window columns per
+    # (pair, Donchian lengths), for extending those columns over new candles.
+    # Only kept in dry-run/live, where pairs are analysed again as candles arrive
+    _last_windowed: Dict[tuple, tuple] = {}
+    
+    def _indicator_cache_key(self, dataframe: DataFrame, metadata: dict) -> tuple:
         """
-        Populate indicators used by the strategy
+        Identify a block of candles and the indicator parameters applied to it
+        """
+        if len(dataframe) > 0:
+            dates = dataframe['date']
+            span = (dates.iat[0], dates.iat[-1])
+        else:
+            span = (None, None)
+        
+        return (metadata.get('pair'), len(dataframe), *span,
+                self.don_len_entry, self.don_len_exit, self.ema_len, self.atr_len)
+    
+    def _reanalyses_pairs(self) -> bool:
+        """
+        Whether pairs are analysed again as new candles arrive (dry-run/live)
+        """
+        return self.config.get('runmode') in (RunMode.DRY_RUN, RunMode.LIVE)
+    
+    def _caches_indicators(self) -> bool:
         """
+        Whether the same candles can be analysed again, making the indicator cache
+        worth its memory (a backtest analyses each pair once)
+        """
+        return self._reanalyses_pairs() or (
+            self.config.get('runmode') == RunMode.HYPEROPT
+            and bool(self.config.get('analyze_per_epoch'))
+        )
+    
+    def _windowed_tail(self, previous: Optional[tuple], dates: np.ndarray,
+                       sources: Tuple[np.ndarray, ...]) -> Optional[Tuple[int, int]]:
+        """
+        Line this frame up against the previous call's candles for the same pair
         
-        # Donchian channels
-        dataframe['don_upper_entry'] = dataframe['high'].rolling(
-            window=self.don_len_entry
-        ).max()
-        dataframe['don_lower_entry'] = dataframe['low'].rolling(
-            window=self.don_len_entry
-        ).min()
+        Returns (shift, new_rows) when the frame is the previous one with `shift`
+        candles dropped from the front and `new_rows` appended, and the candles
+        the new rows' windows reach back over are unchanged; otherwise None.
+        """
+        if previous is None or len(dates) == 0:
+            return None
         
-        dataframe['don_upper_exit'] = dataframe['high'].rolling(
-            window=self.don_len_exit
-        ).max()
-        dataframe['don_lower_exit'] = dataframe['low'].rolling(
-            window=self.don_len_exit
-        ).min()
-        dataframe['don_mid_exit'] = (dataframe['don_upper_exit'] + dataframe['don_lower_exit']) / 2
+        prev_dates, prev_sources, _ = previous
+        shift = int(np.searchsorted(prev_dates, dates[0]))
+        overlap = len(prev_dates) - shift
+        if (shift >= len(prev_dates) or prev_dates[shift] != dates[0]
+                or overlap >= len(dates) or dates[overlap - 1] != prev_dates[-1]):
+            return None
         
-        # EMA trend filter
-        dataframe['ema'] = ta.EMA(dataframe, timeperiod=self.ema_len)
+        start = max(overlap - max(self.don_len_entry, self.don_len_exit, 20), 0)
+        for prev, current in zip(prev_sources, sources):
+            if not np.array_equal(prev[shift + start:], current[start:overlap], equal_nan=True):
+                return None
         
-        # ATR for stops and position sizing
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=self.atr_len)
+        return shift, len(dates) - overlap
+    
+    def _compute_indicators(self, dataframe: DataFrame, pair: Optional[str]) -> Dict[str, np.ndarray]:
+        """
+        Compute all indicator columns as plain arrays
+        """
+        indicators = {}
         
-        # Additional trend confirmation indicators
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        dataframe['macd'], dataframe['macdsignal'], dataframe['macdhist'] = ta.MACD(dataframe)
+        # Candles pulled out of the dataframe once, in their own dtype, and fed to
+        # every kernel below. The Donchian bands are pure max/min selections of
+        # these, so they keep that dtype and stay exactly comparable with close;
+        # the smoothed indicators are stored as float32, which is plenty for
+        # thresholds and comparisons.
+        high = dataframe['high'].to_numpy()
+        low = dataframe['low'].to_numpy()
+        close = dataframe['close'].to_numpy()
+        volume = dataframe['volume'].to_numpy()
         
-        # Volume indicators
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
+        # Donchian channels and the volume SMA (bottleneck moving windows; NaN until
+        # a full window, like rolling()). With process_only_new_candles each call
+        # usually sees the previous frame shifted by the new candle(s), so these are
+        # extended over that tail only. EMA/ATR/RSI/MACD are recursive and seeded
+        # from the start of the frame, so they are always recomputed in full.
+        dates = dataframe['date'].to_numpy(dtype='datetime64[ns]')  # UTC, also for tz-aware dates
+        sources = (high, low, volume)
+        state_key = (pair, self.don_len_entry, self.don_len_exit)
+        # Backtests and hyperopt analyse each pair once: keeping its arrays there
+        # would only pin the frame's candles in memory until the process exits
+        track_tail = self._reanalyses_pairs()
+        previous = self._last_windowed.get(state_key) if track_tail else None
+        tail = self._windowed_tail(previous, dates, sources)
         
-        return dataframe
+        for column, values, move, window in (
+            ('don_upper_entry', high, bn.move_max, self.don_len_entry),
+            ('don_lower_entry', low, bn.move_min, self.don_len_entry),
+            ('don_upper_exit', high, bn.move_max, self.don_len_exit),
+            ('don_lower_exit', low, bn.move_min, self.don_len_exit),
+            # float64 running sum, as bottleneck accumulates in the input dtype
+            ('volume_sma', volume.astype(np.float64, copy=False), bn.move_mean, 20),
+        ):
+            if tail is None:
+                indicators[column] = move(values, window=window, min_count=window)
+            else:
+                shift, new_rows = tail
+                head = move(values[-(new_rows + window - 1):], window=window, min_count=window)
+                extended = np.concatenate((previous[2][column][shift:], head[-new_rows:]))
+                extended[:window - 1] = np.nan  # as a full pass: nothing before a full window
+                indicators[column] = extended
+        indicators['volume_sma'] = indicators['volume_sma'].astype(np.float32, copy=False)
+        
+        if track_tail:
+            self._last_windowed[state_key] = (dates, sources, dict(indicators))
+        
+        # Mid-line halved in place, so the sum is the only temporary
+        mid_exit = indicators['don_upper_exit'] + indicators['don_lower_exit']
+        mid_exit *= 0.5
+        indicators['don_mid_exit'] = mid_exit
+        
+        # Previous candle's entry upper, shifted once here so the breakout check is a plain compare
+        upper = indicators['don_upper_entry']
+        upper_prev = np.empty_like(upper)
+        upper_prev[:1] = np.nan
+        upper_prev[1:] = upper[:-1]
+        indicators['don_upper_entry_prev'] = upper_prev
+        
+        # EMA trend filter, ATR for stops and position sizing, and the additional
+        # trend confirmation indicators
+        if njit is not None:
+            indicators['ema'] = _ema(close, self.ema_len)
+            (indicators['atr'], indicators['macd'], indicators['macdsignal'],
+             indicators['macdhist'], indicators['rsi']) = _atr_macd_rsi(
+                high, low, close, self.atr_len, 12, 26, 9, 14)
+        else:
+            # TA-Lib's direct C bindings on the same arrays (they need float64), skipping
+            # the abstract API's input marshalling
+            high64, low64, close64 = (
+                values.astype(np.float64, copy=False) for values in (high, low, close)
+            )
+            outputs = {
+                'ema': talib.EMA(close64, timeperiod=self.ema_len),
+                'atr': talib.ATR(high64, low64, close64, timeperiod=self.atr_len),
+                'rsi': talib.RSI(close64, timeperiod=14),
+            }
+            outputs['macd'], outputs['macdsignal'], outputs['macdhist'] = talib.MACD(close64)
+            for column, values in outputs.items():
+                indicators[column] = values.astype(np.float32)
+        
+        return indicators
     
-    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+    def _store_indicators(self, key: tuple, indicators: Dict[str, np.ndarray]) -> None:
         """
-        Populate buy trend using Donchian breakout + EMA filter
+        Add computed indicator arrays to the cache, evicting the oldest entry when full
+        """
+        cache = self._indicator_cache
+        cache[key] = indicators
+        if len(cache) > self._indicator_cache_size:
+            cache.popitem(last=False)
+    
+    def bot_start(self, **kwargs) -> None:
         """
+        Compile the Numba kernels (or load them from the disk cache) before the
+        first candle, so live trading doesn't stall on JIT compilation
+        """
+        if njit is None:
+            return
         
-        pair = metadata['pair']
+        # float64 candles and float32 indicators read back through to_numpy(), as
+        # the kernels see them in live mode: the array flags then match whatever
+        # the installed pandas hands out (read-only views under copy-on-write,
+        # writeable arrays before it), so the primed specialisations are the ones
+        # actually used
+        frame = DataFrame({
+            'candles': np.linspace(1.0, 2.0, 64),
+            'values': np.full(64, np.nan, dtype=np.float32),
+        })
+        candles = frame['candles'].to_numpy()
+        values = frame['values'].to_numpy()
         
-        # Get latest values for debugging
-        if len(dataframe) > 0:
-            latest = dataframe.iloc[-1]
-            prev = dataframe.iloc[-2] if len(dataframe) > 1 else latest
-            
-            # Debug logging every few candles - simplified
-            if len(dataframe) % 12 == 0:  # Every hour (12 * 5min candles)
-                try:
-                    price = latest['close'] if pd.notna(latest['close']) else 0
-                    ema = latest['ema'] if pd.notna(latest['ema']) else 0
-                    logger.info(f"🔍 {pair} Analysis: Price: ${price:.2f} | EMA200: ${ema:.2f}")
-                except Exception as e:
-                    logger.info(f"🔍 {pair} Analysis error: {e}")
+        _ema(candles, self.ema_len)
+        _atr_macd_rsi(candles, candles, candles, self.atr_len, 12, 26, 9, 14)
+        _entry_mask(candles, candles, values, candles, values, values, values, values)
+        _exit_mask(candles, candles, values, values, values)
+    
+    def analyze(self, pairs: List[str]) -> None:
+        """
+        Analyze all pairs, computing their indicators on a thread pool first
+        
+        Freqtrade analyzes pairs one after another. The indicator kernels release
+        the GIL, so the candles of every pair with a new candle are run through
+        _compute_indicators concurrently and cached; the serial analysis that
+        follows then only copies the cached arrays into each dataframe.
+        """
+        if njit is not None and len(pairs) > 1 and self._caches_indicators():
+            self._prefetch_indicators(pairs)
+        
+        super().analyze(pairs)
+    
+    def _prefetch_indicators(self, pairs: List[str]) -> None:
+        """
+        Compute and cache indicators for the pairs' current candles in parallel
+        """
+        candle_type = self.config.get('candle_type_def', CandleType.SPOT)
+        pending = {}
+        for pair in pairs:
+            # Read-only use, so skip the copy analyze_pair makes for itself
+            dataframe = self.dp.ohlcv(pair, self.timeframe, copy=False, candle_type=candle_type)
+            if not isinstance(dataframe, DataFrame) or dataframe.empty:
+                continue
+            key = self._indicator_cache_key(dataframe, {'pair': pair})
+            # Already cached means no new candle since the last analysis
+            if key not in self._indicator_cache:
+                pending[key] = (dataframe, pair)
+            # More would evict the first prefetched entries before they are used
+            if len(pending) == self._indicator_cache_size:
+                break
+        
+        if len(pending) < 2:
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as pool:
+            results = pool.map(lambda item: self._compute_indicators(*item), pending.values())
+            # Cache writes stay on this thread
+            for key, indicators in zip(pending, results):
+                self._store_indicators(key, indicators)
+    
+    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        Populate indicators used by the strategy
+        """
+        
+        if not self._caches_indicators():
+            # Analysed once, so the fresh arrays go straight into the dataframe
+            indicators = self._compute_indicators(dataframe, metadata.get('pair'))
+            for column, values in indicators.items():
+                dataframe[column] = values
+            return dataframe
+        
+        cache = self._indicator_cache
+        key = self._indicator_cache_key(dataframe, metadata)
+        indicators = cache.get(key)
         
-        conditions = []
+        if indicators is None:
+            indicators = self._compute_indicators(dataframe, metadata.get('pair'))
+            self._store_indicators(key, indicators)
+        else:
+            cache.move_to_end(key)
         
-        # Primary condition: Close breaks above Donchian upper (entry)
-        breakout_condition = dataframe['close'] > dataframe['don_upper_entry'].shift(1)
-        conditions.append(breakout_condition)
+        # Copies, so later edits to the dataframe can't reach the cached arrays
+        for column, values in indicators.items():
+            dataframe[column] = values.copy()
+        
+        return dataframe
+    
+    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        Populate buy trend using Donchian breakout + EMA filter
+        """
         
-        # Trend filter: Price above EMA
-        trend_condition = dataframe['close'] > dataframe['ema']
-        conditions.append(trend_condition)
+        pair = metadata['pair']
         
-        # Volume confirmation: Above average volume
-        volume_condition = dataframe['volume'] > dataframe['volume_sma']
-        conditions.append(volume_condition)
+        # No entries while the daily loss limit is hit, so skip all the condition work
+        if self._is_daily_loss_locked():
+            dataframe['enter_long'] = np.zeros(len(dataframe), dtype=np.int8)
+            return dataframe
         
-        # RSI not overbought
-        rsi_condition = dataframe['rsi'] < 75
-        conditions.append(rsi_condition)
+        close = dataframe['close'].to_numpy()
+        upper_prev = dataframe['don_upper_entry_prev'].to_numpy()
+        ema = dataframe['ema'].to_numpy()
+        volume = dataframe['volume'].to_numpy()
+        volume_sma = dataframe['volume_sma'].to_numpy()
+        rsi = dataframe['rsi'].to_numpy()
+        macd = dataframe['macd'].to_numpy()
+        macdsignal = dataframe['macdsignal'].to_numpy()
         
-        # MACD momentum confirmation
-        macd_condition = dataframe['macd'] > dataframe['macdsignal']
-        conditions.append(macd_condition)
+        if njit is not None:
+            all_conditions = _entry_mask(close, upper_prev, ema, volume, volume_sma,
+                                         rsi, macd, macdsignal)
+        else:
+            # Entry conditions ANDed in place into a single mask; each comparison
+            # after the first writes into one reused scratch buffer
+            
+            # Primary condition: Close breaks above Donchian upper (entry)
+            all_conditions = close > upper_prev
+            condition = np.empty_like(all_conditions)
+            
+            # Trend filter: Price above EMA
+            all_conditions &= np.greater(close, ema, out=condition)
+            
+            # Volume confirmation: Above average volume
+            all_conditions &= np.greater(volume, volume_sma, out=condition)
+            
+            # RSI not overbought
+            all_conditions &= np.less(rsi, 75, out=condition)
+            
+            # MACD momentum confirmation
+            all_conditions &= np.greater(macd, macdsignal, out=condition)
         
-        # Check for actual signals
-        all_conditions = reduce(lambda x, y: x & y, conditions)
-        signal_count = all_conditions.sum()
+        # Debug logging every few candles, read straight off the arrays
+        if (logger.isEnabledFor(logging.DEBUG) and len(close) > 0
+                and len(close) % 12 == 0):  # Every hour (12 * 5min candles)
+            logger.debug(f"🔍 {pair} Analysis: Price: ${close[-1]:.2f} | EMA200: ${ema[-1]:.2f}")
         
-        if signal_count > 0:
-            logger.info(f"🎯 BUY SIGNAL for {pair}! Conditions met: {signal_count}")
-            logger.info(f"   💰 Price: ${latest['close']:.2f} broke above Donchian: ${prev['don_upper_entry']:.2f}")
+        # Report a signal on the latest candle, the one a live bot acts on
+        if len(close) > 0 and all_conditions[-1]:
+            logger.info(f"🎯 BUY SIGNAL for {pair}!")
+            logger.info(f"   💰 Price: ${close[-1]:.2f} broke above Donchian: ${upper_prev[-1]:.2f}")
         
-        if conditions:
-            dataframe.loc[all_conditions, 'enter_long'] = 1
+        # 0/1 int8 column straight from the mask (a bool view, no copy)
+        dataframe['enter_long'] = all_conditions.view(np.int8)
         
         return dataframe
     
@@ -208,36 +599,52 @@ class DonchianATRTrend(IStrategy):
         
         pair = metadata['pair']
         
-        conditions = []
+        close = dataframe['close'].to_numpy()
+        mid_exit = dataframe['don_mid_exit'].to_numpy()
+        rsi = dataframe['rsi'].to_numpy()
+        macd = dataframe['macd'].to_numpy()
+        macdsignal = dataframe['macdsignal'].to_numpy()
         
-        # Primary exit: Close drops below Donchian mid (exit)
-        mid_exit_condition = dataframe['close'] < dataframe['don_mid_exit']
-        conditions.append(mid_exit_condition)
-        
-        # Alternative exit: RSI overbought
-        rsi_exit_condition = dataframe['rsi'] > 80
-        conditions.append(rsi_exit_condition)
+        if njit is not None:
+            any_exit = _exit_mask(close, mid_exit, rsi, macd, macdsignal)
+        else:
+            # Exit conditions ORed in place into a single mask, with the same
+            # scratch-buffer pattern as the entry mask
+            
+            # Primary exit: Close drops below Donchian mid (exit)
+            any_exit = close < mid_exit
+            condition = np.empty_like(any_exit)
+            
+            # Alternative exit: RSI overbought
+            any_exit |= np.greater(rsi, 80, out=condition)
+            
+            # Alternative exit: MACD bearish cross, the previous candle compared on offset
+            # slices rather than shifted Series (an explicit >=, as NaN fails both tests)
+            macd_bear = np.less(macd, macdsignal, out=condition)
+            macd_bear[:1] = False
+            macd_bear[1:] &= macd[:-1] >= macdsignal[:-1]
+            any_exit |= macd_bear
         
-        # Alternative exit: MACD bearish cross
-        macd_bear = (
-            (dataframe['macd'] < dataframe['macdsignal']) &
-            (dataframe['macd'].shift(1) >= dataframe['macdsignal'].shift(1))
-        )
-        conditions.append(macd_bear)
+        # Report an exit on the latest candle
+        if len(close) > 0 and any_exit[-1]:
+            logger.info(f"🚪 EXIT SIGNAL for {pair}!")
+            logger.info(f"   💸 Price: ${close[-1]:.2f} | RSI: {rsi[-1]:.1f}")
         
-        # Check for exit signals
-        any_exit = reduce(lambda x, y: x | y, conditions)
-        exit_count = any_exit.sum()
+        dataframe['exit_long'] = any_exit.view(np.int8)
         
-        if exit_count > 0:
-            latest = dataframe.iloc[-1]
-            logger.info(f"🚪 EXIT SIGNAL for {pair}! Exit conditions met: {exit_count}")
-            logger.info(f"   💸 Price: ${latest['close']:.2f} | RSI: {latest['rsi']:.1f}")
+        return dataframe
+    
+    def _latest_atr(self, pair: str) -> Optional[float]:
+        """
+        ATR of the last analyzed candle for the pair, or None when there is no data
+        """
+        dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
         
-        if conditions:
-            dataframe.loc[any_exit, 'exit_long'] = 1
+        if dataframe is None or len(dataframe) == 0:
+            return None
         
-        return dataframe
+        # Scalar access; iloc[-1] would box the value through a Series lookup
+        return float(dataframe['atr'].iat[-1])
     
     def custom_stake_amount(self, pair: str, current_time, current_rate: float,
                           proposed_stake: float, min_stake: Optional[float], max_stake: float,
@@ -246,80 +653,70 @@ class DonchianATRTrend(IStrategy):
         """
         Calculate position size based on R (risk unit) and ATR stop distance
         """
-        try:
-            # Get the latest analyzed dataframe
-            dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-            
-            if dataframe is None or len(dataframe) == 0:
-                logger.warning(f"No dataframe available for {pair}")
-                return proposed_stake
-            
-            # Get latest ATR
-            latest_atr = dataframe['atr'].iloc[-1]
-            
-            if pd.isna(latest_atr) or latest_atr <= 0:
-                logger.warning(f"Invalid ATR for {pair}: {latest_atr}")
-                return proposed_stake
-            
-            # Calculate stop distance in USD
-            stop_distance = latest_atr * self.atr_mult
-            
-            # Calculate position size: R / stop_distance
-            # This gives us the USD amount to risk per R unit
-            calculated_stake = self.r_usd / stop_distance
-            
-            # Ensure we don't exceed wallet limits
-            if calculated_stake > max_stake:
-                logger.info(f"Calculated stake {calculated_stake} exceeds max {max_stake} for {pair}")
-                return max_stake
-            
-            if min_stake and calculated_stake < min_stake:
-                logger.info(f"Calculated stake {calculated_stake} below min {min_stake} for {pair}")
-                return min_stake
-            
-            logger.info(f"Position sizing for {pair}: ATR={latest_atr:.6f}, "
-                       f"Stop distance={stop_distance:.6f}, Stake=${calculated_stake:.2f}")
-            
-            return calculated_stake
-            
-        except Exception as e:
-            logger.error(f"Error in custom_stake_amount for {pair}: {e}")
+        # Get latest ATR from the analyzed dataframe
+        latest_atr = self._latest_atr(pair)
+        
+        if latest_atr is None:
+            logger.warning(f"No dataframe available for {pair}")
+            return proposed_stake
+        
+        if math.isnan(latest_atr) or latest_atr <= 0:
+            logger.warning(f"Invalid ATR for {pair}: {latest_atr}")
             return proposed_stake
+        
+        # Calculate stop distance in USD
+        stop_distance = latest_atr * self.atr_mult
+        
+        # Calculate position size: R / stop_distance
+        # This gives us the USD amount to risk per R unit
+        calculated_stake = self.r_usd / stop_distance
+        
+        # Ensure we don't exceed wallet limits
+        if calculated_stake > max_stake:
+            logger.info(f"Calculated stake {calculated_stake} exceeds max {max_stake} for {pair}")
+            return max_stake
+        
+        if min_stake and calculated_stake < min_stake:
+            logger.info(f"Calculated stake {calculated_stake} below min {min_stake} for {pair}")
+            return min_stake
+        
+        logger.info(f"Position sizing for {pair}: ATR={latest_atr:.6f}, "
+                   f"Stop distance={stop_distance:.6f}, Stake=${calculated_stake:.2f}")
+        
+        return calculated_stake
     
     def custom_stoploss(self, pair: str, trade, current_time, current_rate: float,
                        current_profit: float, **kwargs) -> float:
         """
         Dynamic stoploss based on ATR
         """
-        try:
-            # Get the latest analyzed dataframe
-            dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
-            
-            if dataframe is None or len(dataframe) == 0:
-                return self.stoploss
-            
-            # Get latest ATR
-            latest_atr = dataframe['atr'].iloc[-1]
-            
-            if pd.isna(latest_atr) or latest_atr <= 0:
-                return self.stoploss
-            
-            # Calculate ATR-based stop level
-            entry_rate = trade.open_rate
-            atr_stop_distance = latest_atr * self.atr_mult
-            atr_stop_level = entry_rate - atr_stop_distance
-            
-            # Convert to percentage loss from current rate
-            stop_loss_ratio = (atr_stop_level - current_rate) / current_rate
-            
-            # Ensure stop loss doesn't exceed our maximum
-            stop_loss_ratio = max(stop_loss_ratio, -0.10)  # Max 10% loss
-            
-            return stop_loss_ratio
-            
-        except Exception as e:
-            logger.error(f"Error in custom_stoploss for {pair}: {e}")
+        # Get latest ATR from the analyzed dataframe
+        latest_atr = self._latest_atr(pair)
+        
+        if latest_atr is None:
             return self.stoploss
+        
+        if math.isnan(latest_atr) or latest_atr <= 0:
+            return self.stoploss
+        
+        # Calculate ATR-based stop level
+        entry_rate = trade.open_rate
+        atr_stop_distance = latest_atr * self.atr_mult
+        atr_stop_level = entry_rate - atr_stop_distance
+        
+        # Convert to percentage loss from current rate
+        stop_loss_ratio = (atr_stop_level - current_rate) / current_rate
+        
+        # Ensure stop loss doesn't exceed our maximum
+        stop_loss_ratio = max(stop_loss_ratio, -0.10)  # Max 10% loss
+        
+        return stop_loss_ratio
+    
+    def _is_daily_loss_locked(self) -> bool:
+        """
+        Whether today's realised loss (daily_loss_r, when tracked) has hit the limit
+        """
+        return hasattr(self, 'daily_loss_r') and self.daily_loss_r >= self.max_daily_loss_r
     
     def confirm_trade_entry(self, pair: str, order_type: str, amount: float,
                           rate: float, time_in_force: str, current_time,
@@ -329,20 +726,18 @@ class DonchianATRTrend(IStrategy):
         """
         try:
             # Check daily loss limit
-            if hasattr(self, 'daily_loss_r'):
-                if self.daily_loss_r >= self.max_daily_loss_r:
-                    logger.warning(f"Daily loss limit reached: {self.daily_loss_r}R")
-                    return False
+            if self._is_daily_loss_locked():
+                logger.warning(f"Daily loss limit reached: {self.daily_loss_r}R")
+                return False
             
-            # Get current market conditions
-            dataframe, _ = self.dp.get_analyzed_dataframe(pair, self.timeframe)
+            # Get current market conditions (latest ATR)
+            latest_atr = self._latest_atr(pair)
             
-            if dataframe is None or len(dataframe) == 0:
+            if latest_atr is None:
                 return False
             
             # Additional confirmation: ensure ATR is reasonable
-            latest_atr = dataframe['atr'].iloc[-1]
-            if pd.isna(latest_atr) or latest_atr <= 0:
+            if math.isnan(latest_atr) or latest_atr <= 0:
                 logger.warning(f"Invalid ATR for entry confirmation: {latest_atr}")
                 return False
             
@@ -379,17 +774,3 @@ class DonchianATRTrend(IStrategy):
         No leverage for this strategy
         """
         return 1.0
-
-
-def reduce(function, iterable, initializer=None):
-    """
-    Reduce function for older Python versions compatibility
-    """
-    it = iter(iterable)
-    if initializer is None:
-        value = next(it)
-    else:
-        value = initializer
-    for element in it:
-        value = function(value, element)
-    return value